@@ -1,32 +1,96 @@
 from __future__ import annotations
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.storage import Store
 
-from .const import DOMAIN, PLATFORMS
-from .coordinator import BmzCoordinator
+from .const import DOMAIN, PLATFORMS, STORAGE_VERSION
+from .coordinator import BmzCoordinator, snapshot_key
+from .services import async_setup_services
 
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the integration from YAML (not used, but required by HA)."""
+    async_setup_services(hass)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up BMZ Power2Grid from a config entry."""
     coordinator = BmzCoordinator(hass=hass, entry=entry)
-    await coordinator.async_config_entry_first_refresh()
+    restored = await coordinator.async_restore()
+    if restored:
+        # Entities start from the last snapshot; don't let a slow or
+        # sleeping dongle hold up Home Assistant startup.
+        entry.async_create_background_task(
+            hass, _async_start(entry, coordinator), f"{DOMAIN} first refresh {entry.entry_id}"
+        )
+    else:
+        try:
+            # Probe the registers before the first poll so it only reads
+            # what the device implements
+            await coordinator.async_discover()
+            await coordinator.async_config_entry_first_refresh()
+        except Exception:
+            # Give back the shared gateway connection before HA retries setup
+            await coordinator.async_close()
+            raise
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    if not restored:
+        _async_start_stream(entry, coordinator)
+    if coordinator.proxy is not None:
+        await coordinator.proxy.async_start()
     return True
 
 
+async def _async_start(entry: ConfigEntry, coordinator: BmzCoordinator) -> None:
+    if not coordinator.discovered:
+        await coordinator.async_discover()
+    await coordinator.async_refresh()
+    _async_start_stream(entry, coordinator)
+
+
+@callback
+def _async_start_stream(entry: ConfigEntry, coordinator: BmzCoordinator) -> None:
+    """Start the stream now if the last refresh succeeded, else after the next one that does."""
+    stream = coordinator.stream
+    if stream is None:
+        return
+    if coordinator.last_update_success:
+        stream.async_start()
+        return
+
+    @callback
+    def _async_updated() -> None:
+        nonlocal remove
+        if coordinator.last_update_success and remove is not None:
+            remove()
+            remove = None
+            stream.async_start()
+
+    @callback
+    def _async_unload() -> None:
+        if remove is not None:
+            remove()
+
+    remove: CALLBACK_TYPE | None = coordinator.async_add_listener(_async_updated)
+    entry.async_on_unload(_async_unload)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
-    return unload_ok
\ No newline at end of file
+        coordinator: BmzCoordinator | None = hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
+        if coordinator is not None:
+            await coordinator.async_close()
+    return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the stored snapshot of a removed entry."""
+    await Store(hass, STORAGE_VERSION, snapshot_key(entry.entry_id)).async_remove()
\ No newline at end of file
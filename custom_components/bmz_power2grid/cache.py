@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import struct
+
+_WORD = struct.Struct(">H")
+
+
+class RegisterCache:
+    """Last value read from each holding register, per unit.
+
+    Every successful block read lands here, including the gaps a merged
+    read spans; each register keeps the time it was read, so callers (the
+    proxy, the read_registers service) decide how old a value they accept.
+    Written registers are dropped until they are read again.
+    """
+
+    def __init__(self) -> None:
+        self._units: dict[int, dict[int, tuple[int, float]]] = {}
+
+    def store(self, unit: int, address: int, raw: bytes, now: float) -> None:
+        registers = self._units.setdefault(unit, {})
+        for offset, (word,) in enumerate(_WORD.iter_unpack(raw)):
+            registers[address + offset] = (word, now)
+
+    def invalidate(self, unit: int, address: int, count: int) -> None:
+        registers = self._units.get(unit)
+        if registers:
+            for register in range(address, address + count):
+                registers.pop(register, None)
+
+    def get(self, unit: int, address: int, count: int, max_age: float, now: float) -> bytes | None:
+        """Payload of `count` registers at `address`, if all were read within `max_age` seconds."""
+        registers = self._units.get(unit)
+        if registers is None:
+            return None
+        oldest = now - max_age
+        words = []
+        for register in range(address, address + count):
+            entry = registers.get(register)
+            if entry is None or entry[1] < oldest:
+                return None
+            words.append(entry[0])
+        return struct.pack(f">{count}H", *words)
+
+    def missing(self, unit: int, address: int, count: int, max_age: float, now: float) -> list[int]:
+        """Registers of the range without a value read within `max_age` seconds."""
+        registers = self._units.get(unit, {})
+        oldest = now - max_age
+        return [
+            register
+            for register in range(address, address + count)
+            if (entry := registers.get(register)) is None or entry[1] < oldest
+        ]
+
+    def as_dict(self) -> dict:
+        return {unit: len(registers) for unit, registers in self._units.items()}
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, Sequence
+
+from .metrics import MODBUS_EXCEPTIONS, TIMEOUTS, ClientMetrics
+from .modbus_tcp import build_read_pdu, build_write_pdu, check_response_pdu
+from .rtu_codec import ModbusExceptionError
+
+_LOGGER = logging.getLogger(__name__)
+
+# First bytes of every capture file; the last byte is the format version
+FILE_MAGIC = b"BMZCAP\n\x01"
+# [wall clock time][unit][request PDU length][response PDU length], followed
+# by both PDUs (function code onwards, without CRC or MBAP header)
+RECORD = struct.Struct("<dBHH")
+
+# Records are handed to the writer thread in chunks of about this size ...
+FLUSH_BYTES = 64 * 1024
+# ... or after this many seconds, whichever comes first
+FLUSH_INTERVAL = 5.0
+# Rotated files kept next to the one being written
+DEFAULT_BACKUPS = 3
+
+# Exception code returned for requests missing from a replayed capture
+_ILLEGAL_DATA_ADDRESS = 0x02
+
+
+class FrameRecorder:
+    """Append every request and response of a client to a binary log.
+
+    Frames are stored as unit ID plus PDU, so RTU and Modbus TCP captures
+    share one format; a request without a valid answer (timeout, bad CRC)
+    is stored with an empty response. Records are collected in memory and
+    written by a single worker thread, so the event loop never waits for
+    the disk. A file that would grow beyond `max_bytes` is rotated to
+    `.1`, `.2`, ..., keeping `backups` old files.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int, backups: int = DEFAULT_BACKUPS) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.records = 0
+        self._buffer = bytearray()
+        self._flushed_at = time.monotonic()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bmz_capture")
+
+    def record(self, unit: int, request: bytes | memoryview, response: bytes | memoryview) -> None:
+        buffer = self._buffer
+        buffer += RECORD.pack(time.time(), unit, len(request), len(response))
+        buffer += request
+        buffer += response
+        self.records += 1
+        if len(buffer) >= FLUSH_BYTES or time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        """Hand the buffered records to the writer thread."""
+        self._flushed_at = time.monotonic()
+        if self._buffer:
+            chunk, self._buffer = bytes(self._buffer), bytearray()
+            self._executor.submit(self._write, chunk)
+
+    def _write(self, chunk: bytes) -> None:
+        try:
+            size = self.path.stat().st_size if self.path.exists() else 0
+            if size and size + len(chunk) > self.max_bytes:
+                self._rotate()
+                size = 0
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("ab") as file:
+                if not size:
+                    file.write(FILE_MAGIC)
+                file.write(chunk)
+        except OSError as err:
+            _LOGGER.warning("Writing frame capture %s failed: %s", self.path, err)
+
+    def _rotate(self) -> None:
+        if not self.backups:
+            self.path.unlink()
+            return
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+
+    async def async_close(self) -> None:
+        """Write what is buffered and stop the writer thread."""
+        self.flush()
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    def as_dict(self) -> dict:
+        return {"path": str(self.path), "max_bytes": self.max_bytes, "records": self.records}
+
+
+def iter_records(buffer: bytes | memoryview) -> Iterator[tuple[float, int, memoryview, memoryview]]:
+    """Yield (time, unit, request PDU, response PDU) from a capture file.
+
+    `buffer` may be a memory-mapped file; the PDUs are views into it. A
+    truncated last record (the file is still being written) is skipped.
+    """
+    view = memoryview(buffer)
+    if view[: len(FILE_MAGIC)] != FILE_MAGIC:
+        raise ValueError("Not a frame capture")
+    unpack = RECORD.unpack_from
+    header = RECORD.size
+    end = len(view)
+    offset = len(FILE_MAGIC)
+    while offset + header <= end:
+        timestamp, unit, request_len, response_len = unpack(view, offset)
+        start = offset + header
+        offset = start + request_len + response_len
+        if offset > end:
+            break
+        yield timestamp, unit, view[start : start + request_len], view[start + request_len : offset]
+
+
+class ReplayClient:
+    """Answer requests from a capture instead of a gateway.
+
+    Every request gets the responses captured for the identical request in
+    turn, starting over once they run out. Requests missing from the capture
+    get an illegal data address exception, except writes, which succeed.
+    Same interface as RtuOverTcpClient, so a capture can drive the
+    coordinator in tests and benchmarks without hardware.
+    """
+
+    def __init__(self, path: str | Path, timeout: float = 3.0, idle_timeout: float = 60.0) -> None:
+        self.host = str(path)
+        self.port = 0
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.recorder: FrameRecorder | None = None
+        self.metrics = ClientMetrics()
+        self._responses: dict[tuple[int, bytes], list[bytes]] = {}
+        self._next: dict[tuple[int, bytes], int] = {}
+        for _timestamp, unit, request, response in iter_records(Path(path).read_bytes()):
+            self._responses.setdefault((unit, bytes(request)), []).append(bytes(response))
+        # Unit IDs found in the capture
+        self.units = sorted({unit for unit, _request in self._responses})
+
+    @property
+    def connected(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def read_holding_registers_raw(self, unit: int, address: int, count: int) -> bytes:
+        pdu = await self._request(unit, build_read_pdu(address, count))
+        return pdu[2:]
+
+    async def write_registers(self, unit: int, address: int, values: Sequence[int]) -> None:
+        request = build_write_pdu(address, tuple(values))
+        if (unit, request) in self._responses:
+            await self._request(unit, request)
+        else:
+            await asyncio.sleep(0)
+            self.metrics.record_request(0.0)
+
+    async def _request(self, unit: int, request: bytes) -> bytes:
+        # Yield like a real request so concurrent callers interleave
+        await asyncio.sleep(0)
+        key = (unit, request)
+        responses = self._responses.get(key)
+        if not responses:
+            self.metrics.record_request(None, MODBUS_EXCEPTIONS)
+            raise ModbusExceptionError(_ILLEGAL_DATA_ADDRESS)
+        index = self._next.get(key, 0)
+        self._next[key] = (index + 1) % len(responses)
+        response = responses[index]
+        if not response:
+            self.metrics.record_request(None, TIMEOUTS)
+            raise IOError(f"No response to this request in {self.host}")
+        try:
+            check_response_pdu(response, request)
+        except ModbusExceptionError:
+            self.metrics.record_request(None, MODBUS_EXCEPTIONS)
+            raise
+        self.metrics.record_request(0.0)
+        return response
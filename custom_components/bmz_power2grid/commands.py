@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import struct
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import DOMAIN
+from .planner import ReadBlock, plan_reads
+from .transport import ModbusClient
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingWrite:
+    values: tuple[int, ...]
+    # Callers waiting for this write, including those it superseded
+    waiters: list[asyncio.Future[None]] = field(default_factory=list)
+
+
+class CommandQueue:
+    """Register writes waiting for the gateway, coalesced per register.
+
+    Writes are sent by one background task ahead of any queued poll reads.
+    A write to a register that already has one pending replaces its value
+    instead of queueing another request; all callers are released when the
+    surviving value has been written. Written values are remembered until
+    the coordinator reads them back on its next poll.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: ModbusClient) -> None:
+        self.hass = hass
+        self.client = client
+        self._pending: dict[tuple[int, int], _PendingWrite] = {}
+        self._task: asyncio.Task | None = None
+        # Written values not yet verified, by (unit, address)
+        self.unverified: dict[tuple[int, int], tuple[int, ...]] = {}
+        self.writes = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.verify_failures = 0
+
+    async def async_write(self, unit: int, address: int, values: tuple[int, ...]) -> None:
+        """Queue a write and wait until it (or a newer value) was sent."""
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        pending = self._pending.get((unit, address))
+        if pending is None:
+            self._pending[(unit, address)] = _PendingWrite(values, [waiter])
+        else:
+            pending.values = values
+            pending.waiters.append(waiter)
+            self.coalesced += 1
+        if self._task is None or self._task.done():
+            self._task = self.hass.async_create_background_task(self._drain(), f"{DOMAIN} command queue")
+        await waiter
+
+    async def _drain(self) -> None:
+        while self._pending:
+            # Oldest register first; a write arriving while its register is
+            # on the wire is queued again and sent afterwards.
+            key = next(iter(self._pending))
+            pending = self._pending.pop(key)
+            unit, address = key
+            try:
+                await self.client.write_registers(unit, address, pending.values)
+            except asyncio.CancelledError:
+                _resolve(pending.waiters, IOError("Command queue stopped"))
+                raise
+            except IOError as err:
+                self.failed += 1
+                _LOGGER.debug("Writing %s to register %s of unit %s failed: %s", pending.values, address, unit, err)
+                _resolve(pending.waiters, err)
+                continue
+            self.writes += 1
+            self.unverified[key] = pending.values
+            _resolve(pending.waiters)
+
+    def take_unverified(self) -> dict[tuple[int, int], tuple[int, ...]]:
+        unverified, self.unverified = self.unverified, {}
+        return unverified
+
+    async def async_verify(
+        self,
+        read_block: Callable[[int, ReadBlock], Awaitable[bytes]],
+        read_gap: Callable[[int], int],
+    ) -> None:
+        """Read back the registers written since the last call, in as few reads as possible.
+
+        Registers whose read-back fails are checked again on the next call.
+        Raises HomeAssistantError naming every register that reads a value
+        other than the one written.
+        """
+        written = self.take_unverified()
+        mismatches = []
+        for unit in {unit for unit, _address in written}:
+            spans = [(address, len(values)) for (u, address), values in written.items() if u == unit]
+            for block in plan_reads(spans, max_gap=read_gap(unit)):
+                try:
+                    raw = await read_block(unit, block)
+                except IOError as err:
+                    _LOGGER.debug("Reading back written registers of unit %s failed: %s", unit, err)
+                    for address, count in spans:
+                        if block.covers(address, count):
+                            # Try again next time unless a newer write replaced it
+                            self.unverified.setdefault((unit, address), written[(unit, address)])
+                    continue
+                words = struct.unpack(f">{block.count}H", raw)
+                for address, count in spans:
+                    if not block.covers(address, count):
+                        continue
+                    offset = address - block.address
+                    actual = words[offset:offset + count]
+                    # A newer write may have landed while reading back
+                    if actual != written[(unit, address)] and (unit, address) not in self.unverified:
+                        self.verify_failures += 1
+                        mismatches.append(
+                            f"register {address} of unit {unit} reads {actual} after writing {written[(unit, address)]}"
+                        )
+        if mismatches:
+            raise HomeAssistantError("Write not applied: " + "; ".join(mismatches))
+
+    async def async_close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for pending in self._pending.values():
+            _resolve(pending.waiters, IOError("Connection closed"))
+        self._pending.clear()
+
+    def as_dict(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "verify_failures": self.verify_failures,
+        }
+
+
+def _resolve(waiters: list[asyncio.Future[None]], error: Exception | None = None) -> None:
+    for waiter in waiters:
+        if waiter.done():
+            continue
+        if error is None:
+            waiter.set_result(None)
+        else:
+            waiter.set_exception(error)
@@ -10,11 +10,46 @@ from .const import (
     DEFAULT_PORT,
     DEFAULT_UNIT_ID,
     DEFAULT_SCAN_INTERVAL,
+    DEFAULT_MAX_GAP,
+    DEFAULT_MEDIUM_INTERVAL,
+    DEFAULT_SLOW_INTERVAL,
+    DEFAULT_MAX_AGE,
+    DEFAULT_STREAM_INTERVAL,
+    DEFAULT_CAPTURE_SIZE,
+    DEFAULT_PROXY_PORT,
+    DEFAULT_PROXY_TTL,
+    DEFAULT_PROXY_HOST,
+    DEFAULT_PROXY_WRITES,
+    DEFAULT_OVERRUN_POLICY,
+    DEFAULT_TRANSPORT,
+    OVERRUN_POLICIES,
+    TRANSPORTS,
     CONF_UNIT_ID,
     CONF_SCAN_INTERVAL,
+    CONF_MAX_GAP,
+    CONF_MEDIUM_INTERVAL,
+    CONF_SLOW_INTERVAL,
+    CONF_ADDITIONAL_UNIT_IDS,
+    CONF_MAX_AGE,
+    CONF_STREAM_INTERVAL,
+    CONF_CAPTURE_SIZE,
+    CONF_PROXY_PORT,
+    CONF_PROXY_TTL,
+    CONF_PROXY_HOST,
+    CONF_PROXY_WRITES,
+    CONF_OVERRUN_POLICY,
+    CONF_TRANSPORT,
 )
 
 
+def _parse_unit_ids(value: str) -> list[int]:
+    """Parse a comma separated list of unit IDs, e.g. "1, 2"."""
+    unit_ids = [int(part) for part in value.replace(" ", "").split(",") if part]
+    if any(not 0 <= u <= 255 for u in unit_ids):
+        raise ValueError("Unit ID out of range")
+    return unit_ids
+
+
 class BmzPower2GridConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
@@ -24,9 +59,26 @@ class BmzPower2GridConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             host = user_input[CONF_HOST]
             port = user_input[CONF_PORT]
+            transport = user_input[CONF_TRANSPORT]
             unit_id = user_input[CONF_UNIT_ID]
             scan_interval = user_input[CONF_SCAN_INTERVAL]
+            max_gap = user_input[CONF_MAX_GAP]
+            medium_interval = user_input[CONF_MEDIUM_INTERVAL]
+            slow_interval = user_input[CONF_SLOW_INTERVAL]
+            max_age = user_input[CONF_MAX_AGE]
+            stream_interval = user_input[CONF_STREAM_INTERVAL]
+            capture_size = user_input[CONF_CAPTURE_SIZE]
+            proxy_port = user_input[CONF_PROXY_PORT]
+            proxy_ttl = user_input[CONF_PROXY_TTL]
+            proxy_host = user_input[CONF_PROXY_HOST]
+            proxy_writes = user_input[CONF_PROXY_WRITES]
+            overrun_policy = user_input[CONF_OVERRUN_POLICY]
+            try:
+                additional_unit_ids = _parse_unit_ids(user_input.get(CONF_ADDITIONAL_UNIT_IDS, ""))
+            except ValueError:
+                errors[CONF_ADDITIONAL_UNIT_IDS] = "invalid_unit_ids"
 
+        if user_input is not None and not errors:
             await self.async_set_unique_id(f"{host}:{port}:{unit_id}")
             self._abort_if_unique_id_configured()
 
@@ -35,8 +87,21 @@ class BmzPower2GridConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 data={
                     CONF_HOST: host,
                     CONF_PORT: port,
+                    CONF_TRANSPORT: transport,
                     CONF_UNIT_ID: unit_id,
                     CONF_SCAN_INTERVAL: scan_interval,
+                    CONF_MAX_GAP: max_gap,
+                    CONF_MEDIUM_INTERVAL: medium_interval,
+                    CONF_SLOW_INTERVAL: slow_interval,
+                    CONF_ADDITIONAL_UNIT_IDS: additional_unit_ids,
+                    CONF_MAX_AGE: max_age,
+                    CONF_STREAM_INTERVAL: stream_interval,
+                    CONF_CAPTURE_SIZE: capture_size,
+                    CONF_PROXY_PORT: proxy_port,
+                    CONF_PROXY_TTL: proxy_ttl,
+                    CONF_PROXY_HOST: proxy_host,
+                    CONF_PROXY_WRITES: proxy_writes,
+                    CONF_OVERRUN_POLICY: overrun_policy,
                 },
             )
 
@@ -44,8 +109,29 @@ class BmzPower2GridConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             {
                 vol.Required(CONF_HOST): str,
                 vol.Optional(CONF_PORT, default=DEFAULT_PORT): int,
+                vol.Optional(CONF_TRANSPORT, default=DEFAULT_TRANSPORT): vol.In(TRANSPORTS),
                 vol.Optional(CONF_UNIT_ID, default=DEFAULT_UNIT_ID): int,
+                vol.Optional(CONF_ADDITIONAL_UNIT_IDS, default=""): str,
                 vol.Optional(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): int,
+                vol.Optional(CONF_MEDIUM_INTERVAL, default=DEFAULT_MEDIUM_INTERVAL): int,
+                vol.Optional(CONF_SLOW_INTERVAL, default=DEFAULT_SLOW_INTERVAL): int,
+                vol.Optional(CONF_MAX_AGE, default=DEFAULT_MAX_AGE): vol.All(int, vol.Range(min=0)),
+                vol.Optional(CONF_MAX_GAP, default=DEFAULT_MAX_GAP): vol.All(int, vol.Range(min=0, max=100)),
+                vol.Optional(CONF_OVERRUN_POLICY, default=DEFAULT_OVERRUN_POLICY): vol.In(OVERRUN_POLICIES),
+                vol.Optional(CONF_STREAM_INTERVAL, default=DEFAULT_STREAM_INTERVAL): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, max=60)
+                ),
+                vol.Optional(CONF_CAPTURE_SIZE, default=DEFAULT_CAPTURE_SIZE): vol.All(
+                    int, vol.Range(min=0, max=1000)
+                ),
+                vol.Optional(CONF_PROXY_PORT, default=DEFAULT_PROXY_PORT): vol.All(
+                    int, vol.Range(min=0, max=65535)
+                ),
+                vol.Optional(CONF_PROXY_TTL, default=DEFAULT_PROXY_TTL): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, max=3600)
+                ),
+                vol.Optional(CONF_PROXY_HOST, default=DEFAULT_PROXY_HOST): str,
+                vol.Optional(CONF_PROXY_WRITES, default=DEFAULT_PROXY_WRITES): bool,
             }
         )
         return self.async_show_form(step_id="user", data_schema=schema, errors=errors)
@@ -4,14 +4,77 @@ DOMAIN = "bmz_power2grid"
 
 DEFAULT_PORT = 5743
 DEFAULT_UNIT_ID = 252
-DEFAULT_SCAN_INTERVAL = 5  # seconds
+DEFAULT_SCAN_INTERVAL = 5  # seconds (fast tier: power readings)
+DEFAULT_MEDIUM_INTERVAL = 30  # seconds (V/A/Hz, SOC, temperatures)
+DEFAULT_SLOW_INTERVAL = 60  # seconds (energy counters, SOH)
+DEFAULT_MAX_GAP = 16  # unused registers a merged block read may span
+MAX_REGISTERS_PER_REQUEST = 125  # Modbus limit for function 0x03
+DEFAULT_MAX_AGE = 60  # seconds a value may be overdue before its sensor goes unavailable
+READ_RETRIES = 2  # extra attempts for a failed block within one cycle
+RETRY_BACKOFF = 0.2  # seconds before the first retry, doubled per attempt
+RETRY_BACKOFF_MAX = 1.0  # seconds
+DEFAULT_STREAM_INTERVAL = 0.0  # seconds between grid meter samples, 0 = streaming off
+STREAM_BUFFER_SIZE = 600  # samples kept in memory per entry
+STREAM_STATE_INTERVAL = 1.0  # seconds between entity updates while streaming
+# Register groups read by the streaming loop instead of the coordinator
+STREAM_GROUPS = ("grid_power", "battery_power")
+# Rolling statistics kept in memory for these power readings
+STATS_KEYS = ("pv_power_w", "battery_power_w", "grid_power_total_w")
+STATS_WINDOWS = (60, 300, 900)  # seconds
+STATS_BUFFER_SIZE = 2048  # samples per key; enough for 15 min at 0.5 s streaming
+DEFAULT_CAPTURE_SIZE = 0  # MB per raw frame capture file, 0 = not recording
+DEFAULT_PROXY_PORT = 0  # local Modbus proxy port, 0 = no proxy
+DEFAULT_PROXY_TTL = 10.0  # seconds a cached register may be served to proxy clients
+DEFAULT_PROXY_HOST = "127.0.0.1"  # address the proxy listens on; "0.0.0.0" for every interface
+DEFAULT_PROXY_WRITES = False  # whether proxy clients may write registers
+DEFAULT_READ_MAX_AGE = 10.0  # seconds a cached register may be returned by read_registers
+MAX_READ_REGISTERS = 1000  # registers one read_registers call may ask for
+# Share of the scan interval a poll cycle may take; reads still running
+# then are cancelled and carried over to the next cycle
+CYCLE_DEADLINE_FACTOR = 0.8
+STRETCH_MAX_FACTOR = 4  # a stretched interval is at most this many scan intervals
 
 PLATFORMS: list[str] = ["sensor"]
 
+# Last decoded values, restored on setup so startup does not wait for the device
+STORAGE_VERSION = 1
+SNAPSHOT_INTERVAL = 300  # seconds between snapshot writes while polling
+
 # Use homeassistant.const for CONF_HOST and CONF_PORT
 # Only define custom config keys here
 CONF_UNIT_ID = "unit_id"
 CONF_SCAN_INTERVAL = "scan_interval"
+CONF_MAX_GAP = "max_gap"
+CONF_MEDIUM_INTERVAL = "medium_interval"
+CONF_SLOW_INTERVAL = "slow_interval"
+CONF_ADDITIONAL_UNIT_IDS = "additional_unit_ids"
+CONF_MAX_AGE = "max_age"
+CONF_STREAM_INTERVAL = "stream_interval"
+CONF_TRANSPORT = "transport"
+CONF_CAPTURE_SIZE = "capture_size"
+CONF_PROXY_PORT = "proxy_port"
+CONF_PROXY_TTL = "proxy_ttl"
+CONF_PROXY_HOST = "proxy_host"
+CONF_PROXY_WRITES = "proxy_writes"
+CONF_OVERRUN_POLICY = "overrun_policy"
+
+# Gateway framings
+TRANSPORT_RTU_OVER_TCP = "rtu_over_tcp"  # RTU frames (with CRC) over a TCP socket, one request at a time
+TRANSPORT_MODBUS_TCP = "modbus_tcp"  # Modbus TCP (MBAP header), several requests in flight
+TRANSPORTS = (TRANSPORT_RTU_OVER_TCP, TRANSPORT_MODBUS_TCP)
+DEFAULT_TRANSPORT = TRANSPORT_RTU_OVER_TCP
+
+# What to do after a poll cycle ran out of time
+OVERRUN_SKIP = "skip"  # leave out the next cycle
+OVERRUN_STRETCH = "stretch"  # lengthen the interval until cycles fit again
+OVERRUN_SHED = "shed"  # read only the fast tier until cycles fit again
+OVERRUN_POLICIES = (OVERRUN_SKIP, OVERRUN_STRETCH, OVERRUN_SHED)
+DEFAULT_OVERRUN_POLICY = OVERRUN_SHED
+
+# Polling tiers; each register group belongs to exactly one
+TIER_FAST = "fast"
+TIER_MEDIUM = "medium"
+TIER_SLOW = "slow"
 
 # =============================================================================
 # REGISTER MAP - Based on official Solinteg Modbus Protocol v00.02 (2022-12-06)
@@ -74,6 +137,19 @@ REG_DAILY_BATTERY_DISCHARGE_U16 = 31004  # Daily Battery Discharging Energy (U16
 REG_DAILY_PV_GENERATION_U16 = 31005   # Daily PV Generation (U16, kWh, /10)
 REG_DAILY_LOAD_U16 = 31006            # Daily Load Consumption (U16, kWh, /10)
 
+# --- CONTROL (writable holding registers) ---
+REG_GRID_INJECTION_LIMIT_SWITCH_U16 = 25100  # Grid injection power limit (U16: 0=off, 1=on)
+REG_GRID_INJECTION_LIMIT_U16 = 25103  # Grid injection power limit (U16, % of rated power, /10)
+REG_WORKING_MODE_U16 = 50000          # Working mode (U16, see WORKING_MODES)
+REG_BATTERY_POWER_SET_I32 = 50207     # Battery power setpoint (I32, kW, /1000) - positive=discharge, negative=charge
+
+WORKING_MODES = {
+    "general": 0x0101,
+    "economic": 0x0102,
+    "ups": 0x0103,
+    "off_grid": 0x0200,
+}
+
 # --- SCALING FACTORS ---
 SCALE_KW_TO_W = 1000                  # kW values from device need *1000 for W
 SCALE_VOLTAGE = 0.1                   # /10 for V
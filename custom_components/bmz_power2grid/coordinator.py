@@ -1,60 +1,109 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from datetime import timedelta
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from homeassistant.const import CONF_HOST, CONF_PORT
+from homeassistant.const import CONF_HOST, CONF_PORT, Platform
 
 from .const import (
     DOMAIN,
     CONF_UNIT_ID,
     CONF_SCAN_INTERVAL,
+    CONF_MAX_GAP,
+    CONF_MEDIUM_INTERVAL,
+    CONF_SLOW_INTERVAL,
+    CONF_ADDITIONAL_UNIT_IDS,
+    CONF_MAX_AGE,
+    CONF_STREAM_INTERVAL,
+    CONF_CAPTURE_SIZE,
+    CONF_PROXY_PORT,
+    CONF_PROXY_TTL,
+    CONF_PROXY_HOST,
+    CONF_PROXY_WRITES,
+    CONF_OVERRUN_POLICY,
+    CONF_TRANSPORT,
     DEFAULT_PORT,
     DEFAULT_UNIT_ID,
     DEFAULT_SCAN_INTERVAL,
-    # Register addresses
-    REG_PV_POWER_KW_U32,
-    REG_BATTERY_POWER_KW_I32,
-    REG_BATTERY_VOLTAGE_U16,
-    REG_BATTERY_CURRENT_I16,
-    REG_BATTERY_SOC_U16,
-    REG_BATTERY_SOH_U16,
-    REG_GRID_METER_L1_KW_I32,
-    REG_GRID_METER_TOTAL_KW_I32,
-    REG_GRID_L1_VOLTAGE_U16,
-    REG_GRID_FREQUENCY_U16,
-    REG_INVERTER_TEMP_I16,
-    REG_BATTERY_TEMP_U16,
-    # Native energy counters
-    REG_TOTAL_GRID_EXPORT_U32,
-    REG_TOTAL_GRID_IMPORT_U32,
-    REG_TOTAL_BATTERY_CHARGE_U32,
-    REG_TOTAL_BATTERY_DISCHARGE_U32,
-    REG_TOTAL_PV_GENERATION_U32,
-    REG_TOTAL_LOAD_U32,
-    REG_DAILY_GRID_EXPORT_U16,
-    REG_DAILY_GRID_IMPORT_U16,
-    REG_DAILY_BATTERY_CHARGE_U16,
-    REG_DAILY_BATTERY_DISCHARGE_U16,
-    REG_DAILY_PV_GENERATION_U16,
-    REG_DAILY_LOAD_U16,
-    # Scaling
-    SCALE_VOLTAGE,
-    SCALE_CURRENT,
-    SCALE_FREQUENCY,
-    SCALE_TEMPERATURE,
-    SCALE_PERCENT,
-    SCALE_ENERGY_10,
+    DEFAULT_MAX_GAP,
+    DEFAULT_MEDIUM_INTERVAL,
+    DEFAULT_SLOW_INTERVAL,
+    DEFAULT_MAX_AGE,
+    DEFAULT_STREAM_INTERVAL,
+    DEFAULT_CAPTURE_SIZE,
+    DEFAULT_PROXY_PORT,
+    DEFAULT_PROXY_TTL,
+    DEFAULT_PROXY_HOST,
+    DEFAULT_PROXY_WRITES,
+    DEFAULT_OVERRUN_POLICY,
+    DEFAULT_TRANSPORT,
+    CYCLE_DEADLINE_FACTOR,
+    OVERRUN_SHED,
+    OVERRUN_SKIP,
+    OVERRUN_STRETCH,
+    READ_RETRIES,
+    RETRY_BACKOFF,
+    RETRY_BACKOFF_MAX,
+    SNAPSHOT_INTERVAL,
+    STRETCH_MAX_FACTOR,
+    STATS_BUFFER_SIZE,
+    STATS_KEYS,
+    STATS_WINDOWS,
+    STORAGE_VERSION,
+    TIER_FAST,
+    TIER_MEDIUM,
+    TIER_SLOW,
 )
 
-from .modbus_client import RtuOverTcpClient, regs_to_s32_be, regs_to_u32_be, regs_to_s16
+from .cache import RegisterCache
+from .capture import FrameRecorder
+from .commands import CommandQueue
+from .derived import DERIVED_SOURCES, POWER_INPUTS, DerivedMetrics
+from .discovery import RegisterProfile, async_probe_unit
+from .metrics import PollMetrics
+from .planner import ReadBlock, plan_reads
+from .proxy import ModbusProxy
+from .registers import KEY_GROUPS, REGISTER_GROUPS, FieldSpec, RegisterGroup, compile_groups
+from .rtu_codec import ModbusExceptionError
+from .stream import GridStream
+from .timeseries import RollingSeries
+from .transport import acquire_client, release_client
 
 _LOGGER = logging.getLogger(__name__)
 
 
+_FULL_PROFILE = RegisterProfile()
+
+# Order in which the blocks of a cycle are requested
+_TIER_RANK = {TIER_FAST: 0, TIER_MEDIUM: 1, TIER_SLOW: 2}
+
+
+def _register_keys(key: str) -> set[str]:
+    """Keys read from the device that `key` is decoded or derived from."""
+    sources = DERIVED_SOURCES.get(key)
+    if sources is None:
+        return {key}
+    # DerivedMetrics only runs with all power inputs at hand
+    return set(POWER_INPUTS).union(*(_register_keys(source) for source in sources))
+
+
+def _block_rank(keys) -> int:
+    """Rank of the fastest tier a block serves."""
+    return min((_TIER_RANK[KEY_GROUPS[key].tier] for key in keys if key in KEY_GROUPS), default=0)
+
+
+def snapshot_key(entry_id: str) -> str:
+    return f"{DOMAIN}.{entry_id}"
+
+
 class BmzCoordinator(DataUpdateCoordinator[dict]):
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
         self.entry = entry
@@ -63,12 +112,92 @@ class BmzCoordinator(DataUpdateCoordinator[dict]):
         port = entry.data.get(CONF_PORT, DEFAULT_PORT)
         unit_id = entry.data.get(CONF_UNIT_ID, DEFAULT_UNIT_ID)
         scan_interval = entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
+        max_gap = entry.data.get(CONF_MAX_GAP, DEFAULT_MAX_GAP)
 
         self.host = host
         self.port = port
+        self.transport = entry.data.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
         self.unit_id = unit_id
+        # Further devices (cascaded inverters, battery stacks) behind the same
+        # gateway that this entry polls in the same cycle.
+        self.unit_ids: tuple[int, ...] = (unit_id, *(
+            int(u) for u in entry.data.get(CONF_ADDITIONAL_UNIT_IDS, ()) if int(u) != unit_id
+        ))
+        self.unit_data: dict[int, dict] = {}
+        self.max_gap = int(max_gap)
+
+        # The coordinator ticks at the fast tier; slower tiers are read on
+        # the ticks where they are due and keep their values in between.
+        self.tier_intervals: dict[str, float] = {
+            TIER_FAST: float(scan_interval),
+            TIER_MEDIUM: float(entry.data.get(CONF_MEDIUM_INTERVAL, DEFAULT_MEDIUM_INTERVAL)),
+            TIER_SLOW: float(entry.data.get(CONF_SLOW_INTERVAL, DEFAULT_SLOW_INTERVAL)),
+        }
+        # Last successful read of each (unit, group); groups whose read
+        # failed stay due and are retried on the next tick.
+        self._last_read: dict[tuple[int, str], float] = {}
+        self.max_age = float(entry.data.get(CONF_MAX_AGE, DEFAULT_MAX_AGE))
+        # What to do while cycles do not fit their deadline (see
+        # _apply_overrun_policy)
+        self.overrun_policy = entry.data.get(CONF_OVERRUN_POLICY, DEFAULT_OVERRUN_POLICY)
+        self.overrunning = False
+        self._skip_next = False
+        self.metrics = PollMetrics()
+        # Short-term history of the power readings, per unit and key
+        self.series: dict[int, dict[str, RollingSeries]] = {}
+        # House load, ratios and refined energy, per unit
+        self.derived: dict[int, DerivedMetrics] = {}
+
+        # Raw registers from every block read, for ad-hoc reads and the proxy
+        self.registers = RegisterCache()
+
+        # (unit, key, enabled by default) behind the unique ID of each
+        # sensor, set by the sensor platform, the entity IDs registered for
+        # them and the names of the groups the enabled ones need per unit;
+        # until the platform is set up every group is polled
+        self._entity_keys: dict[str, tuple[int, str, bool]] = {}
+        self._entity_ids: set[str] = set()
+        self.polled_groups: dict[int, frozenset[str]] = {}
+        self._unsub_registry = hass.bus.async_listen(
+            er.EVENT_ENTITY_REGISTRY_UPDATED,
+            self._async_update_polled_groups,
+            event_filter=self._is_own_entity_event,
+        )
+
+        # Registers each unit implements, from discovery; units without a
+        # profile are assumed to implement everything
+        self.profiles: dict[int, RegisterProfile] = {}
+
+        # Snapshot of the last decoded values and register profiles; restored
+        # values are shown as stale until their group is read live
+        self._store: Store[dict] = Store(hass, STORAGE_VERSION, snapshot_key(entry.entry_id))
+        self._restored_at: float | None = None
+        self._snapshot_at = 0.0
+
+        # Keep the connection open across cycles; only close it when polling
+        # has clearly stopped, so steady-state polling never reconnects.
+        # Entries on the same gateway share one client.
+        self.client = acquire_client(
+            hass,
+            entry.entry_id,
+            host,
+            port,
+            timeout=3.0,
+            idle_timeout=max(60.0, 3 * float(scan_interval)),
+            transport=self.transport,
+        )
 
-        self.client = RtuOverTcpClient(host=host, port=port, timeout=3.0)
+        # Optional log of every frame on the gateway connection, for
+        # replaying odd values offline (see tools/replay.py)
+        self.recorder: FrameRecorder | None = None
+        capture_size = float(entry.data.get(CONF_CAPTURE_SIZE, DEFAULT_CAPTURE_SIZE))
+        if capture_size > 0 and self.client.recorder is None:
+            self.recorder = self.client.recorder = FrameRecorder(
+                hass.config.path(DOMAIN, f"capture_{host}_{port}.bin"), int(capture_size * 1024 * 1024)
+            )
+
+        # Control writes, sent ahead of poll reads
+        self.commands = CommandQueue(hass, self.client)
 
         super().__init__(
             hass=hass,
@@ -76,138 +205,451 @@ class BmzCoordinator(DataUpdateCoordinator[dict]):
             name=DOMAIN,
             update_interval=timedelta(seconds=int(scan_interval)),
         )
+        self._base_interval = self.update_interval
 
-    async def _async_update_data(self) -> dict:
+        # Optional sub-second sampling of the grid meter and battery power
+        # (e.g. for zero-export control); started once the first refresh
+        # has produced data.
+        stream_interval = float(entry.data.get(CONF_STREAM_INTERVAL, DEFAULT_STREAM_INTERVAL))
+        self.stream: GridStream | None = (
+            GridStream(hass, self, stream_interval) if stream_interval > 0 else None
+        )
+
+        # Optional local Modbus port for other tools, started with the entry
+        proxy_port = int(entry.data.get(CONF_PROXY_PORT, DEFAULT_PROXY_PORT))
+        self.proxy: ModbusProxy | None = (
+            ModbusProxy(
+                self,
+                entry.data.get(CONF_PROXY_HOST, DEFAULT_PROXY_HOST),
+                proxy_port,
+                float(entry.data.get(CONF_PROXY_TTL, DEFAULT_PROXY_TTL)),
+                bool(entry.data.get(CONF_PROXY_WRITES, DEFAULT_PROXY_WRITES)),
+            )
+            if proxy_port
+            else None
+        )
+
+    async def async_close(self) -> None:
+        """Stop streaming, save a snapshot and release the gateway connection."""
+        self._unsub_registry()
+        if self.proxy is not None:
+            await self.proxy.async_stop()
+        if self.stream is not None:
+            await self.stream.async_stop()
+        await self.commands.async_close()
+        if self.unit_data:
+            await self._store.async_save(self._snapshot())
+        if self.recorder is not None:
+            self.client.recorder = None
+            await self.recorder.async_close()
+        await release_client(self.hass, self.entry.entry_id, self.host, self.port, self.transport)
+
+    async def async_restore(self) -> bool:
+        """Load the last snapshot as current data; returns whether there was one."""
+        stored = await self._store.async_load()
+        if not stored:
+            return False
+        self.profiles = {
+            int(unit): RegisterProfile.from_dict(profile)
+            for unit, profile in stored.get("profiles", {}).items()
+            if int(unit) in self.unit_ids
+        }
+        unit_data = {
+            int(unit): data for unit, data in stored.get("unit_data", {}).items() if int(unit) in self.unit_ids
+        }
+        if self.unit_id not in unit_data:
+            return False
+        self.unit_data = unit_data
+        self.data = unit_data[self.unit_id]
+        self._restored_at = time.monotonic()
+        return True
+
+    def _snapshot(self) -> dict:
+        return {
+            "unit_data": {str(unit): data for unit, data in self.unit_data.items()},
+            "profiles": {str(unit): profile.as_dict() for unit, profile in self.profiles.items()},
+        }
+
+    @property
+    def discovered(self) -> bool:
+        return all(unit in self.profiles for unit in self.unit_ids)
+
+    async def async_discover(self) -> bool:
+        """Probe the registers of every unit and persist the profiles.
+
+        Returns False, keeping the previous profiles, when a unit could not
+        be probed.
+        """
+        profiles: dict[int, RegisterProfile] = {}
+        for unit in self.unit_ids:
+            try:
+                profiles[unit] = await async_probe_unit(self.client, unit, REGISTER_GROUPS, self.max_gap)
+            except IOError as err:
+                _LOGGER.warning("Register discovery for unit %s failed: %s", unit, err)
+                return False
+        self.profiles = profiles
+        self._store.async_delay_save(self._snapshot)
+        return True
+
+    def profile(self, unit: int) -> RegisterProfile:
+        return self.profiles.get(unit, _FULL_PROFILE)
+
+    def supports(self, unit: int, key: str) -> bool:
+        """Whether `unit` implements the register(s) behind `key`."""
+        sources = DERIVED_SOURCES.get(key)
+        if sources is not None:
+            return all(self.supports(unit, source) for source in sources)
+        return self.profile(unit).supports(key)
+
+    @callback
+    def async_set_entity_keys(self, entity_keys: dict[str, tuple[int, str, bool]]) -> None:
+        """Register the (unit, key, enabled by default) of each sensor unique ID.
+
+        From then on only the groups the enabled sensors need are polled.
+        """
+        self._entity_keys = entity_keys
+        self._async_update_polled_groups()
+
+    @callback
+    def _is_own_entity_event(self, event: Event) -> bool:
+        """Whether an entity registry event concerns a sensor of this entry."""
+        if event.data.get("old_entity_id", event.data["entity_id"]) in self._entity_ids:
+            return True
+        entity = er.async_get(self.hass).async_get(event.data["entity_id"])
+        return entity is not None and entity.config_entry_id == self.entry.entry_id
+
+    @callback
+    def _async_update_polled_groups(self, _event: Event | None = None) -> None:
+        """Work out the groups the enabled sensors need."""
+        if not self._entity_keys:
+            return
+        keys: dict[int, set[str]] = {unit: set() for unit in self.unit_ids}
+        entity_ids: set[str] = set()
+        registry = er.async_get(self.hass)
+        for unique_id, (unit, key, enabled_default) in self._entity_keys.items():
+            entity_id = registry.async_get_entity_id(Platform.SENSOR, DOMAIN, unique_id)
+            if entity_id is None:
+                # Not registered yet (first setup); it will be as per its default
+                enabled = enabled_default
+            else:
+                entity_ids.add(entity_id)
+                enabled = registry.entities[entity_id].disabled_by is None
+            if enabled:
+                keys[unit].update(_register_keys(key))
+        self._entity_ids = entity_ids
+        polled_groups = {
+            unit: frozenset(KEY_GROUPS[key].name for key in unit_keys if key in KEY_GROUPS)
+            for unit, unit_keys in keys.items()
+        }
+        if polled_groups != self.polled_groups:
+            _LOGGER.debug("Polling register groups %s", polled_groups)
+            self.polled_groups = polled_groups
+
+    def polled(self, unit: int) -> tuple[RegisterGroup, ...]:
+        """Groups of `unit` that the device implements and an enabled entity needs."""
+        groups = self.profile(unit).groups(REGISTER_GROUPS)
+        names = self.polled_groups.get(unit)
+        if names is None:
+            return groups
+        return tuple(group for group in groups if group.name in names)
+
+    def read_gap(self, unit: int) -> int:
+        """Max gap for merging the reads of `unit`."""
+        max_gap = self.profile(unit).max_gap
+        return self.max_gap if max_gap is None else max_gap
+
+    def values_for(self, unit: int) -> dict | None:
+        """Latest decoded values of one polled unit."""
+        if unit == self.unit_id:
+            return self.data
+        return self.unit_data.get(unit)
+
+    def is_fresh(self, unit: int, key: str) -> bool:
+        """Whether `key` of `unit` was read recently enough to be shown.
+
+        A value may be overdue by up to `max_age` seconds beyond its tier
+        interval, so a few failed reads do not make the sensor flap.
+        """
+        sources = DERIVED_SOURCES.get(key)
+        if sources is not None:
+            return all(self.is_fresh(unit, source) for source in sources)
+        group = KEY_GROUPS.get(key)
+        if group is None:
+            return True
+        last = self._last_read.get((unit, group.name), self._restored_at)
+        if last is None:
+            return False
+        return time.monotonic() - last <= self.tier_intervals[group.tier] + self.max_age
+
+    def is_stale(self, unit: int, key: str) -> bool:
+        """Whether the value of `key` comes from the restored snapshot."""
+        sources = DERIVED_SOURCES.get(key)
+        if sources is not None:
+            return any(self.is_stale(unit, source) for source in sources)
+        group = KEY_GROUPS.get(key)
+        return (
+            group is not None
+            and self._restored_at is not None
+            and (unit, group.name) not in self._last_read
+        )
+
+    def stream_update(self, unit: int, groups: tuple[RegisterGroup, ...], values: dict, now: float) -> None:
+        """Merge a stream sample into the data without notifying listeners.
+
+        Marking the groups as read keeps the regular cycle from reading them
+        again while the stream is healthy; if the stream stalls they come due
+        and are polled as usual.
+        """
+        data = self.values_for(unit)
+        if data is None:
+            return
+        data.update(values)
+        for group in groups:
+            self._last_read[(unit, group.name)] = now
+            self._record_series(unit, group, data, now)
+
+    def _record_series(self, unit: int, group: RegisterGroup, data: dict, now: float) -> None:
+        unit_series = self.series.setdefault(unit, {})
+        for key in group.keys:
+            if key not in STATS_KEYS:
+                continue
+            series = unit_series.get(key)
+            if series is None:
+                series = unit_series[key] = RollingSeries(STATS_WINDOWS, STATS_BUFFER_SIZE)
+            series.append(now, data[key])
+
+    def statistics(
+        self, unit: int, key: str, window: float, percentiles: bool = False
+    ) -> dict[str, float] | None:
+        """Rolling min/max/mean of `key` over the last `window` seconds.
+
+        Median and p95 need the window sorted; ask for them with `percentiles`.
+        """
+        series = self.series.get(unit, {}).get(key)
+        if series is None:
+            return None
+        return series.stats(window, time.monotonic(), percentiles)
+
+    async def async_write(self, unit: int, control: FieldSpec, value: float) -> None:
+        """Write a setting; checked against a read-back on the next poll."""
+        await self.async_write_registers(unit, control.address, control.encode(value))
+
+    async def async_write_registers(self, unit: int, address: int, values: tuple[int, ...]) -> None:
+        """Write raw registers through the command queue.
+
+        Their cached values are dropped, so ad-hoc reads and the proxy never
+        serve what was there before.
+        """
+        try:
+            await self.commands.async_write(unit, address, values)
+        finally:
+            self.registers.invalidate(unit, address, len(values))
+
+    async def async_read_registers(self, unit: int, address: int, count: int, max_age: float) -> bytes:
+        """Payload of `count` registers at `address`, each at most `max_age` seconds old.
+
+        Cached registers are used as they are; the rest are read in as few
+        block reads as the read plan's gap allows, sent concurrently.
+        """
+        now = time.monotonic()
+        missing = self.registers.missing(unit, address, count, max_age, now)
+        if missing:
+            blocks = plan_reads(((register, 1) for register in missing), max_gap=self.read_gap(unit))
+            await asyncio.gather(*(self._async_read_block(unit, block) for block in blocks))
+        raw = self.registers.get(unit, address, count, max_age, now)
+        if raw is None:
+            raise IOError(f"Registers {address}-{address + count - 1} were written while being read")
+        return raw
+
+    async def _async_verify_writes(self) -> None:
+        """Read back the registers written since the last poll."""
         try:
-            # === PV POWER ===
-            # Register 11028: Total PV Input Power (U32, kW, /1000)
-            pv_regs = await self.client.read_holding_registers(self.unit_id, REG_PV_POWER_KW_U32, 2)
-            pv_power_w = regs_to_u32_be(pv_regs)  # Already in W (kW * 1000 = W, but /1000 means raw is in W)
-
-            # === BATTERY POWER ===
-            # Register 30258: Battery_P (I32, kW, /1000) - positive=discharge, negative=charge
-            batt_regs = await self.client.read_holding_registers(self.unit_id, REG_BATTERY_POWER_KW_I32, 2)
-            battery_power_w = regs_to_s32_be(batt_regs)  # Already in W
-
-            battery_charge_w = max(0, -battery_power_w)
-            battery_discharge_w = max(0, battery_power_w)
-
-            # === BATTERY VOLTAGE/CURRENT ===
-            # Registers 30254-30255: Battery V/I
-            batt_vi = await self.client.read_holding_registers(self.unit_id, REG_BATTERY_VOLTAGE_U16, 2)
-            battery_voltage = round(batt_vi[0] * SCALE_VOLTAGE, 1)
-            battery_current = round(regs_to_s16(batt_vi[1]) * SCALE_CURRENT, 1)
-
-            # === BATTERY SOC/SOH ===
-            # Registers 33000-33001: SOC/SOH (U16, %, /100)
-            soc_soh = await self.client.read_holding_registers(self.unit_id, REG_BATTERY_SOC_U16, 2)
-            battery_soc_pct = round(soc_soh[0] * SCALE_PERCENT, 2)
-            battery_soh_pct = round(soc_soh[1] * SCALE_PERCENT, 2)
-
-            # === GRID METER POWER ===
-            # Registers 10994-11001: Per-phase and total grid meter power (I32, kW, /1000)
-            # positive = exporting to grid, negative = importing from grid
-            grid_regs = await self.client.read_holding_registers(self.unit_id, REG_GRID_METER_L1_KW_I32, 8)
-            grid_l1_w = regs_to_s32_be(grid_regs[0:2])
-            grid_l2_w = regs_to_s32_be(grid_regs[2:4])
-            grid_l3_w = regs_to_s32_be(grid_regs[4:6])
-            grid_power_total_w = regs_to_s32_be(grid_regs[6:8])
-
-            # Grid import/export (positive values)
-            grid_import_w = max(0, -grid_power_total_w)  # negative meter = importing
-            grid_export_w = max(0, grid_power_total_w)   # positive meter = exporting
-
-            # === GRID VOLTAGE/CURRENT/FREQUENCY ===
-            # Registers 11009-11015: V/A per phase + frequency
-            grid_vaf = await self.client.read_holding_registers(self.unit_id, REG_GRID_L1_VOLTAGE_U16, 7)
-            grid_l1_v = round(grid_vaf[0] * SCALE_VOLTAGE, 1)
-            grid_l1_a = round(grid_vaf[1] * SCALE_CURRENT, 2)
-            grid_l2_v = round(grid_vaf[2] * SCALE_VOLTAGE, 1)
-            grid_l2_a = round(grid_vaf[3] * SCALE_CURRENT, 2)
-            grid_l3_v = round(grid_vaf[4] * SCALE_VOLTAGE, 1)
-            grid_l3_a = round(grid_vaf[5] * SCALE_CURRENT, 2)
-            grid_frequency = round(grid_vaf[6] * SCALE_FREQUENCY, 2)
-
-            # === TEMPERATURES ===
-            # Register 11032: Inverter temp (I16, °C, /10)
-            inv_temp_raw = (await self.client.read_holding_registers(self.unit_id, REG_INVERTER_TEMP_I16, 1))[0]
-            inverter_temp_c = round(regs_to_s16(inv_temp_raw) * SCALE_TEMPERATURE, 1)
-
-            # Register 33003: Battery temp (U16, °C, /10)
-            bat_temp_raw = (await self.client.read_holding_registers(self.unit_id, REG_BATTERY_TEMP_U16, 1))[0]
-            battery_temp_c = round(bat_temp_raw * SCALE_TEMPERATURE, 1)
-
-            # === NATIVE ENERGY COUNTERS (TOTAL) ===
-            # These are from the device itself - much more accurate than calculating!
-            # Registers 31102-31115: Total energy counters (U32, kWh, /10)
-            energy_totals = await self.client.read_holding_registers(self.unit_id, REG_TOTAL_GRID_EXPORT_U32, 14)
-            total_grid_export_kwh = round(regs_to_u32_be(energy_totals[0:2]) * SCALE_ENERGY_10, 1)
-            total_grid_import_kwh = round(regs_to_u32_be(energy_totals[2:4]) * SCALE_ENERGY_10, 1)
-            # Skip 31106-31107 (backup port energy)
-            total_battery_charge_kwh = round(regs_to_u32_be(energy_totals[6:8]) * SCALE_ENERGY_10, 1)
-            total_battery_discharge_kwh = round(regs_to_u32_be(energy_totals[8:10]) * SCALE_ENERGY_10, 1)
-            total_pv_kwh = round(regs_to_u32_be(energy_totals[10:12]) * SCALE_ENERGY_10, 1)
-            total_load_kwh = round(regs_to_u32_be(energy_totals[12:14]) * SCALE_ENERGY_10, 1)
-
-            # === NATIVE ENERGY COUNTERS (DAILY) ===
-            # Registers 31000-31006: Daily energy counters (U16, kWh, /10)
-            daily_energy = await self.client.read_holding_registers(self.unit_id, REG_DAILY_GRID_EXPORT_U16, 7)
-            daily_grid_export_kwh = round(daily_energy[0] * SCALE_ENERGY_10, 1)
-            daily_grid_import_kwh = round(daily_energy[1] * SCALE_ENERGY_10, 1)
-            # Skip 31002 (backup port)
-            daily_battery_charge_kwh = round(daily_energy[3] * SCALE_ENERGY_10, 1)
-            daily_battery_discharge_kwh = round(daily_energy[4] * SCALE_ENERGY_10, 1)
-            daily_pv_kwh = round(daily_energy[5] * SCALE_ENERGY_10, 1)
-            daily_load_kwh = round(daily_energy[6] * SCALE_ENERGY_10, 1)
-
-            return {
-                # Power (instantaneous, in W)
-                "pv_power_w": pv_power_w,
-                "battery_power_w": battery_power_w,
-                "battery_charge_w": battery_charge_w,
-                "battery_discharge_w": battery_discharge_w,
-                "grid_power_total_w": grid_power_total_w,
-                "grid_l1_w": grid_l1_w,
-                "grid_l2_w": grid_l2_w,
-                "grid_l3_w": grid_l3_w,
-                "grid_import_w": grid_import_w,
-                "grid_export_w": grid_export_w,
-
-                # Battery state
-                "battery_soc_pct": battery_soc_pct,
-                "battery_soh_pct": battery_soh_pct,
-                "battery_voltage": battery_voltage,
-                "battery_current": battery_current,
-
-                # Grid V/A/Hz
-                "grid_l1_v": grid_l1_v,
-                "grid_l1_a": grid_l1_a,
-                "grid_l2_v": grid_l2_v,
-                "grid_l2_a": grid_l2_a,
-                "grid_l3_v": grid_l3_v,
-                "grid_l3_a": grid_l3_a,
-                "grid_frequency": grid_frequency,
-
-                # Temperatures
-                "inverter_temp_c": inverter_temp_c,
-                "battery_temp_c": battery_temp_c,
-
-                # Energy totals (from device, kWh) - for Energy Dashboard
-                "total_pv_energy_kwh": total_pv_kwh,
-                "total_battery_charge_kwh": total_battery_charge_kwh,
-                "total_battery_discharge_kwh": total_battery_discharge_kwh,
-                "total_grid_import_kwh": total_grid_import_kwh,
-                "total_grid_export_kwh": total_grid_export_kwh,
-                "total_load_kwh": total_load_kwh,
-
-                # Daily energy (from device, kWh)
-                "daily_pv_energy_kwh": daily_pv_kwh,
-                "daily_battery_charge_kwh": daily_battery_charge_kwh,
-                "daily_battery_discharge_kwh": daily_battery_discharge_kwh,
-                "daily_grid_import_kwh": daily_grid_import_kwh,
-                "daily_grid_export_kwh": daily_grid_export_kwh,
-                "daily_load_kwh": daily_load_kwh,
-            }
-
-        except Exception as err:
-            raise UpdateFailed(str(err)) from err
+            await self.commands.async_verify(self._async_read_block, self.read_gap)
+        except HomeAssistantError as err:
+            # The writers have long returned; all that is left is to report it
+            _LOGGER.warning("%s", err)
+
+    @property
+    def cycle_deadline(self) -> float:
+        """Seconds a poll cycle may take before its remaining reads are cancelled."""
+        return CYCLE_DEADLINE_FACTOR * self.update_interval.total_seconds()
+
+    @property
+    def shedding(self) -> bool:
+        """Whether only the fast tier is read until cycles fit again."""
+        return self.overrunning and self.overrun_policy == OVERRUN_SHED
+
+    def _due_groups(self, unit: int, now: float) -> tuple[RegisterGroup, ...]:
+        # Half a fast tick of slack so a slower tier is not pushed to the
+        # next tick by scheduling jitter.
+        slack = self.tier_intervals[TIER_FAST] / 2
+        shedding = self.shedding
+        due = []
+        for group in self.polled(unit):
+            if shedding and group.tier != TIER_FAST:
+                continue
+            last = self._last_read.get((unit, group.name))
+            if last is None or now - last >= self.tier_intervals[group.tier] - slack:
+                due.append(group)
+        return tuple(due)
+
+    async def _async_read_block(self, unit: int, block: ReadBlock) -> bytes:
+        """Read one block, retrying transient failures with bounded backoff."""
+        delay = RETRY_BACKOFF
+        for attempt in range(READ_RETRIES + 1):
+            try:
+                raw = await self.client.read_holding_registers_raw(unit, block.address, block.count)
+            except ModbusExceptionError:
+                # The device rejected the request; asking again will not help
+                raise
+            except IOError:
+                if attempt == READ_RETRIES:
+                    raise
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RETRY_BACKOFF_MAX)
+                continue
+            self.registers.store(unit, block.address, raw, time.monotonic())
+            return raw
+        raise AssertionError("unreachable")
+
+    async def _async_timed_read(self, unit: int, block: ReadBlock) -> tuple[bytes, float]:
+        start = time.perf_counter()
+        raw = await self._async_read_block(unit, block)
+        return raw, time.perf_counter() - start
+
+    async def _async_update_unit(
+        self, unit: int, now: float, deadline: float
+    ) -> tuple[dict, list[Exception], int]:
+        """Read the due groups of `unit` until `deadline` (monotonic time).
+
+        Returns the new values, the read errors and the number of blocks
+        cancelled at the deadline. Groups of cancelled blocks are not marked
+        as read, so they are carried over to the next cycle.
+        """
+        groups = self._due_groups(unit, now)
+        decoded: dict = {}
+        errors: list[Exception] = []
+        failed: set[str] = set()
+        carried_over = 0
+        # Fast-changing blocks first, so they are the ones that make the
+        # deadline; the sort keeps address order within a tier.
+        plan = sorted(compile_groups(groups, self.read_gap(unit)), key=lambda item: _block_rank(item[1].keys))
+        # Request every block at once: a pipelining transport keeps them all
+        # in flight, the RTU client queues them in order.
+        tasks = [asyncio.ensure_future(self._async_timed_read(unit, block)) for block, _decoder in plan]
+        try:
+            if tasks:
+                await asyncio.wait(tasks, timeout=max(0.0, deadline - time.monotonic()))
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.wait(tasks)
+        for (block, decoder), task in zip(plan, tasks):
+            if task.cancelled():
+                carried_over += 1
+                failed.update(decoder.keys)
+                continue
+            result = task.exception() or task.result()
+            if isinstance(result, BaseException):
+                if not isinstance(result, IOError):
+                    raise result
+                _LOGGER.debug("Reading %s registers at %s from unit %s failed: %s", block.count, block.address, unit, result)
+                errors.append(result)
+                failed.update(decoder.keys)
+                continue
+            raw, elapsed = result
+            metrics = self.metrics.block(unit, block.address, block.count)
+            start = time.perf_counter()
+            decoder.decode(raw, decoded)
+            metrics.read.record(elapsed)
+            metrics.decode.record(time.perf_counter() - start)
+        # Merge into the current values rather than a copy taken when the
+        # cycle started: the stream updates them in place meanwhile. Groups
+        # it sampled after the cycle started keep the newer sample. Groups
+        # not read or failed keep their last known values.
+        data = self.values_for(unit)
+        if data is None:
+            data = {}
+        streamed = {
+            group.name for group in groups if self._last_read.get((unit, group.name), now) > now
+        }
+        for group in groups:
+            if group.name not in streamed:
+                data.update((key, decoded[key]) for key in group.keys if key in decoded)
+        for group in groups:
+            if group.name in streamed or failed.intersection(f.key for f in group.fields):
+                continue
+            if group.derive is not None:
+                group.derive(data)
+            self._last_read[(unit, group.name)] = now
+            self._record_series(unit, group, data, now)
+        if not failed.intersection(POWER_INPUTS):
+            self.derived.setdefault(unit, DerivedMetrics()).update(data, now)
+        return data, errors, carried_over
+
+    def _apply_overrun_policy(self, overrun: bool, elapsed: float) -> None:
+        """Adjust the next cycles after one overran its deadline, or fit again.
+
+        skip leaves out the cycle after an overrun, stretch doubles the
+        interval (and the deadline with it) up to STRETCH_MAX_FACTOR scan
+        intervals and halves it again once a cycle would have fit the
+        shorter deadline, shed reads only the fast tier until a cycle fits.
+        """
+        if overrun != self.overrunning:
+            _LOGGER.debug(
+                "Poll cycle %s its %.1f s deadline (%.2f s)",
+                "overran" if overrun else "fits",
+                self.cycle_deadline,
+                elapsed,
+            )
+        self.overrunning = overrun
+        if self.overrun_policy == OVERRUN_SKIP:
+            self._skip_next = overrun
+        elif self.overrun_policy == OVERRUN_STRETCH:
+            interval = self.update_interval
+            if overrun:
+                interval = min(interval * 2, self._base_interval * STRETCH_MAX_FACTOR)
+            elif interval > self._base_interval and elapsed < self.cycle_deadline / 2:
+                interval = max(interval / 2, self._base_interval)
+            self.update_interval = interval
+
+    async def _async_update_data(self) -> dict:
+        now = time.monotonic()
+        if self._skip_next and self.data is not None:
+            self._skip_next = False
+            self.metrics.skipped_cycles += 1
+            return self.data
+        start = time.perf_counter()
+        deadline = now + self.cycle_deadline
+        self.metrics.shed_cycles += self.shedding
+        if self.commands.unverified:
+            await self._async_verify_writes()
+        # The shared client interleaves the units' requests fairly.
+        results = await asyncio.gather(
+            *(self._async_update_unit(unit, now, deadline) for unit in self.unit_ids)
+        )
+        errors = [err for _data, unit_errors, _carried in results for err in unit_errors]
+        carried_over = sum(carried for _data, _errors, carried in results)
+        elapsed = time.perf_counter() - start
+        overrun = bool(carried_over) or elapsed > self.update_interval.total_seconds()
+        self.metrics.record_timing(overrun, carried_over)
+        self._apply_overrun_policy(overrun, elapsed)
+        if carried_over:
+            _LOGGER.debug("%s block read(s) carried over to the next cycle", carried_over)
+
+        if errors and not any(
+            self.is_fresh(unit, key) for unit in self.unit_ids for key in KEY_GROUPS
+        ):
+            # Nothing usable left; let every entity go unavailable.
+            self.metrics.record_cycle(time.perf_counter() - start, errors[0])
+            raise UpdateFailed(str(errors[0])) from errors[0]
+        if errors:
+            _LOGGER.debug("%s block read(s) failed; keeping their last values", len(errors))
+
+        self.metrics.record_cycle(time.perf_counter() - start, partial=bool(errors))
+        self.unit_data = {unit: data for unit, (data, _errors, _carried) in zip(self.unit_ids, results)}
+        if now - self._snapshot_at >= SNAPSHOT_INTERVAL:
+            self._snapshot_at = now
+            self._store.async_delay_save(self._snapshot)
+        return self.unit_data[self.unit_id]
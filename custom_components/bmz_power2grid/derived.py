@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+# Below this PV or load power (W) the ratios are meaningless
+MIN_RATIO_POWER = 10.0
+# Resolution of the device's daily energy counters (kWh)
+COUNTER_STEP_KWH = 0.1
+# Longer gaps between readings (seconds) are not integrated over
+MAX_INTEGRATION_GAP = 300.0
+
+# Power readings the stage needs, all from the fast tier
+POWER_INPUTS = ("pv_power_w", "battery_power_w", "grid_power_total_w")
+
+# Daily counters refined by integrating the matching power:
+# (output key, device counter key, power key)
+_REFINED: tuple[tuple[str, str, str], ...] = (
+    ("daily_pv_energy_precise_kwh", "daily_pv_energy_kwh", "pv_power_w"),
+    ("daily_load_precise_kwh", "daily_load_kwh", "house_load_w"),
+    ("daily_grid_import_precise_kwh", "daily_grid_import_kwh", "grid_import_w"),
+    ("daily_grid_export_precise_kwh", "daily_grid_export_kwh", "grid_export_w"),
+    ("daily_battery_charge_precise_kwh", "daily_battery_charge_kwh", "battery_charge_w"),
+    ("daily_battery_discharge_precise_kwh", "daily_battery_discharge_kwh", "battery_discharge_w"),
+)
+
+# Keys each derived value is computed from; a derived value is only as
+# fresh (and as supported) as all of its sources
+DERIVED_SOURCES: dict[str, tuple[str, ...]] = {
+    "house_load_w": POWER_INPUTS,
+    "self_consumption_pct": ("pv_power_w", "grid_power_total_w"),
+    "autarky_pct": POWER_INPUTS,
+    **{out: (counter, power) for out, counter, power in _REFINED},
+}
+
+
+class _Integrator:
+    """Trapezoidal integral of a power reading, in kWh."""
+
+    __slots__ = ("total", "_time", "_power")
+
+    def __init__(self) -> None:
+        self.total = 0.0
+        self._time: float | None = None
+        self._power = 0.0
+
+    def add(self, now: float, power: float) -> float:
+        if self._time is not None and 0 < now - self._time <= MAX_INTEGRATION_GAP:
+            self.total += (self._power + power) / 2 * (now - self._time) / 3_600_000
+        self._time = now
+        self._power = power
+        return self.total
+
+
+class DerivedMetrics:
+    """Per-unit stage computing house load, ratios and refined energy.
+
+    Runs once per poll cycle on the freshly decoded data, so dashboards do
+    not need template sensors re-rendering on every state change. The
+    device's daily counters only move in 0.1 kWh steps; between two steps
+    the energy integrated from the power readings is added on top, capped
+    just below the next step so the value never runs ahead of the device.
+    """
+
+    def __init__(self) -> None:
+        self._integrators = {out: _Integrator() for out, _counter, _power in _REFINED}
+        # Counter value last seen and the integral at that moment, per output
+        self._anchors: dict[str, tuple[float, float]] = {}
+
+    def update(self, data: dict, now: float) -> None:
+        pv = data.get("pv_power_w")
+        battery = data.get("battery_power_w")
+        grid = data.get("grid_power_total_w")
+        if pv is None or battery is None or grid is None:
+            return
+        # Battery positive = discharging, grid positive = exporting
+        load = max(0, pv + battery - grid)
+        grid_export = max(0, grid)
+        grid_import = max(0, -grid)
+        data["house_load_w"] = load
+        # Share of the PV output used on site (house or battery)
+        data["self_consumption_pct"] = (
+            round((pv - min(grid_export, pv)) / pv * 100, 1) if pv >= MIN_RATIO_POWER else None
+        )
+        # Share of the house load not bought from the grid
+        data["autarky_pct"] = (
+            round((load - min(grid_import, load)) / load * 100, 1) if load >= MIN_RATIO_POWER else None
+        )
+
+        for out, counter, power in _REFINED:
+            value = data.get(power)
+            if value is None:
+                continue
+            energy = self._integrators[out].add(now, value)
+            reading = data.get(counter)
+            if reading is None:
+                continue
+            anchor = self._anchors.get(out)
+            if anchor is None or anchor[0] != reading:
+                # The device counter moved (or reset at midnight)
+                anchor = self._anchors[out] = (reading, energy)
+            data[out] = round(reading + min(energy - anchor[1], COUNTER_STEP_KWH - 0.001), 3)
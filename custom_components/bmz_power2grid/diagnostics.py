@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import BmzCoordinator
+from .registers import compile_groups
+
+TO_REDACT = {CONF_HOST}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return polling statistics for a config entry.
+
+    `poll.blocks.*.read` is measured around each block read and includes
+    waiting for the shared gateway; `client.round_trip` is the time on the
+    wire only. A large gap between the two points at contention on the
+    gateway rather than at the network or the device.
+    """
+    coordinator: BmzCoordinator = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "unit_ids": list(coordinator.unit_ids),
+        "tier_intervals": coordinator.tier_intervals,
+        "profiles": {unit: profile.as_dict() for unit, profile in coordinator.profiles.items()},
+        # Groups the enabled entities need, and the blocks read per unit
+        # when every tier is due
+        "polled_groups": {unit: [group.name for group in coordinator.polled(unit)] for unit in coordinator.unit_ids},
+        "read_plan": {
+            unit: [
+                {"address": block.address, "count": block.count}
+                for block, _decoder in compile_groups(coordinator.polled(unit), coordinator.read_gap(unit))
+            ]
+            for unit in coordinator.unit_ids
+        },
+        "poll": coordinator.metrics.as_dict(),
+        "client": {
+            "connected": coordinator.client.connected,
+            **coordinator.client.metrics.as_dict(),
+        },
+        "commands": coordinator.commands.as_dict(),
+        "stream": None if coordinator.stream is None else {
+            "interval": coordinator.stream.interval,
+            "running": coordinator.stream.running,
+            "samples": coordinator.stream.samples,
+            "errors": coordinator.stream.errors,
+            "buffered": len(coordinator.stream.buffer),
+        },
+        "capture": None if coordinator.recorder is None else async_redact_data(coordinator.recorder.as_dict(), {"path"}),
+        "proxy": None if coordinator.proxy is None else coordinator.proxy.as_dict(),
+        "register_cache": coordinator.registers.as_dict(),
+        "data": coordinator.data,
+    }
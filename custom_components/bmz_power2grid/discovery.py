@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, replace
+from functools import lru_cache
+
+from .registers import KEY_GROUPS, RegisterGroup, compile_groups
+from .rtu_codec import ModbusExceptionError
+from .transport import ModbusClient
+
+_LOGGER = logging.getLogger(__name__)
+
+# Exception codes meaning "this device does not have these registers"
+# (illegal function, illegal data address, illegal data value); anything
+# else, e.g. device busy, makes the probe inconclusive.
+_UNSUPPORTED_CODES = frozenset({0x01, 0x02, 0x03})
+
+
+@dataclass(frozen=True)
+class RegisterProfile:
+    """Which decoded fields one unit answers for.
+
+    `max_gap` overrides the configured gap when the device rejects merged
+    reads that span registers it does not implement.
+    """
+
+    unsupported: frozenset[str] = frozenset()
+    max_gap: int | None = None
+
+    def supports(self, key: str) -> bool:
+        if key in self.unsupported:
+            return False
+        group = KEY_GROUPS.get(key)
+        if group is None or key not in group.derived:
+            return True
+        # Derived values need at least one of their group's fields
+        return any(f.key not in self.unsupported for f in group.fields)
+
+    def groups(self, groups: tuple[RegisterGroup, ...]) -> tuple[RegisterGroup, ...]:
+        """`groups` without unsupported fields, and without groups left empty."""
+        if not self.unsupported:
+            return groups
+        return _reduce_groups(groups, self.unsupported)
+
+    def as_dict(self) -> dict:
+        return {"unsupported": sorted(self.unsupported), "max_gap": self.max_gap}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> RegisterProfile:
+        return cls(frozenset(data.get("unsupported", ())), data.get("max_gap"))
+
+
+@lru_cache(maxsize=32)
+def _reduce_groups(groups: tuple[RegisterGroup, ...], unsupported: frozenset[str]) -> tuple[RegisterGroup, ...]:
+    reduced = []
+    for group in groups:
+        fields = tuple(f for f in group.fields if f.key not in unsupported)
+        if fields:
+            reduced.append(group if len(fields) == len(group.fields) else replace(group, fields=fields))
+    return tuple(reduced)
+
+
+async def _readable(client: ModbusClient, unit: int, address: int, count: int) -> bool:
+    try:
+        await client.read_holding_registers_raw(unit, address, count)
+    except ModbusExceptionError as err:
+        if err.code not in _UNSUPPORTED_CODES:
+            raise IOError(f"Probe of {count} registers at {address} inconclusive: {err}") from err
+        return False
+    return True
+
+
+async def async_probe_unit(
+    client: ModbusClient, unit: int, groups: tuple[RegisterGroup, ...], max_gap: int
+) -> RegisterProfile:
+    """Find the fields of `groups` that `unit` implements.
+
+    Every block of the regular read plan is tried first; only blocks the
+    device rejects are probed field by field. Raises IOError when the device
+    cannot be reached, so a flaky link never marks registers unsupported.
+    """
+    fields = [f for group in groups for f in group.fields]
+    unsupported: set[str] = set()
+    rejected = False
+    gaps_rejected = False
+    for block, _decoder in compile_groups(groups, max_gap):
+        if await _readable(client, unit, block.address, block.count):
+            continue
+        rejected = True
+        missing = [
+            f.key
+            for f in fields
+            if block.covers(f.address, f.count) and not await _readable(client, unit, f.address, f.count)
+        ]
+        if not missing:
+            # Every field reads on its own, so the device rejects the
+            # unmapped registers between them
+            gaps_rejected = True
+        unsupported.update(missing)
+
+    profile = RegisterProfile(frozenset(unsupported), 0 if gaps_rejected else None)
+    if rejected and profile.max_gap is None:
+        # Merged reads now skip over the missing registers; some firmware
+        # rejects those, so fall back to reading only contiguous fields.
+        for block, _decoder in compile_groups(profile.groups(groups), max_gap):
+            if not await _readable(client, unit, block.address, block.count):
+                profile = replace(profile, max_gap=0)
+                break
+    if unsupported:
+        _LOGGER.info("Unit %s does not implement: %s", unit, ", ".join(sorted(unsupported)))
+    return profile
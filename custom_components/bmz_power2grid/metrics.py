@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+# Histogram bucket upper bounds in seconds, roughly 1-2-5 per decade
+BUCKETS: tuple[float, ...] = (
+    0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+    0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0,
+)
+
+# Number of recent samples used for the p50/p95 and error-rate sensors
+RECENT_WINDOW = 200
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; recording is one bisect and two adds."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-th percentile (0..1)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else None,
+            "p50_ms": _ms(self.percentile(0.5)),
+            "p95_ms": _ms(self.percentile(0.95)),
+            "max_ms": round(self.max * 1000, 3),
+            "buckets_ms": {
+                ("inf" if i == len(BUCKETS) else str(BUCKETS[i] * 1000)): n
+                for i, n in enumerate(self.counts)
+                if n
+            },
+        }
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def _percentile(samples: deque[float], q: float) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# Client error counters
+TIMEOUTS = "timeouts"
+CRC_ERRORS = "crc_errors"
+FRAME_ERRORS = "frame_errors"
+MODBUS_EXCEPTIONS = "modbus_exceptions"
+CONNECTION_ERRORS = "connection_errors"
+RECONNECTS = "reconnects"
+
+
+@dataclass
+class ClientMetrics:
+    """Per-connection timings and error counters of one gateway client."""
+
+    connect: Histogram = field(default_factory=Histogram)
+    round_trip: Histogram = field(default_factory=Histogram)
+    counters: Counter[str] = field(default_factory=Counter)
+    requests: int = 0
+    # 1 for each failed request, 0 for each successful one
+    recent_errors: deque[int] = field(default_factory=lambda: deque(maxlen=RECENT_WINDOW))
+
+    def record_request(self, seconds: float | None, error: str | None = None) -> None:
+        self.requests += 1
+        if error is None:
+            self.round_trip.record(seconds)
+            self.recent_errors.append(0)
+        else:
+            self.counters[error] += 1
+            self.recent_errors.append(1)
+
+    @property
+    def error_rate(self) -> float | None:
+        """Share of failed requests among the recent ones, in percent."""
+        if not self.recent_errors:
+            return None
+        return round(sum(self.recent_errors) / len(self.recent_errors) * 100, 1)
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "error_rate_pct": self.error_rate,
+            "counters": dict(self.counters),
+            "connect": self.connect.as_dict(),
+            "round_trip": self.round_trip.as_dict(),
+        }
+
+
+@dataclass
+class BlockMetrics:
+    read: Histogram = field(default_factory=Histogram)
+    decode: Histogram = field(default_factory=Histogram)
+
+
+@dataclass
+class PollMetrics:
+    """Cycle and per-block timings of one coordinator."""
+
+    cycle: Histogram = field(default_factory=Histogram)
+    blocks: dict[str, BlockMetrics] = field(default_factory=dict)
+    cycles: int = 0
+    failed_cycles: int = 0
+    # Cycles where some blocks failed but the rest was still delivered
+    partial_cycles: int = 0
+    recent_cycles: deque[float] = field(default_factory=lambda: deque(maxlen=RECENT_WINDOW))
+    last_error: str | None = None
+    # Cycles that ran past their deadline or the scan interval
+    overruns: int = 0
+    # Block reads cancelled at the deadline and left for the next cycle
+    carried_over: int = 0
+    # Cycles left out by the skip policy
+    skipped_cycles: int = 0
+    # Cycles that read only the fast tier under the shed policy
+    shed_cycles: int = 0
+    # 1 for each recent overrun, 0 for each cycle on time
+    recent_overruns: deque[int] = field(default_factory=lambda: deque(maxlen=RECENT_WINDOW))
+
+    def block(self, unit: int, address: int, count: int) -> BlockMetrics:
+        key = f"{unit}:{address}+{count}"
+        metrics = self.blocks.get(key)
+        if metrics is None:
+            metrics = self.blocks[key] = BlockMetrics()
+        return metrics
+
+    def record_cycle(self, seconds: float, error: Exception | None = None, partial: bool = False) -> None:
+        self.cycles += 1
+        if error is not None:
+            self.failed_cycles += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+            return
+        if partial:
+            self.partial_cycles += 1
+        self.cycle.record(seconds)
+        self.recent_cycles.append(seconds)
+
+    def record_timing(self, overrun: bool, carried_over: int = 0) -> None:
+        self.overruns += overrun
+        self.carried_over += carried_over
+        self.recent_overruns.append(int(overrun))
+
+    @property
+    def overrun_rate(self) -> float | None:
+        """Share of recent cycles that overran, in percent."""
+        if not self.recent_overruns:
+            return None
+        return round(sum(self.recent_overruns) / len(self.recent_overruns) * 100, 1)
+
+    def recent_percentile_ms(self, q: float) -> float | None:
+        return _ms(_percentile(self.recent_cycles, q))
+
+    def as_dict(self) -> dict:
+        return {
+            "cycles": self.cycles,
+            "failed_cycles": self.failed_cycles,
+            "partial_cycles": self.partial_cycles,
+            "last_error": self.last_error,
+            "overruns": self.overruns,
+            "carried_over": self.carried_over,
+            "skipped_cycles": self.skipped_cycles,
+            "shed_cycles": self.shed_cycles,
+            "cycle": self.cycle.as_dict(),
+            "blocks": {
+                key: {"read": m.read.as_dict(), "decode": m.decode.as_dict()}
+                for key, m in sorted(self.blocks.items())
+            },
+        }
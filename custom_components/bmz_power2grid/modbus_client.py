@@ -2,75 +2,247 @@ from __future__ import annotations
 
 import asyncio
 import socket
-import struct
-from dataclasses import dataclass
-from typing import Sequence
-
-def crc16_modbus(data: bytes) -> int:
-    crc = 0xFFFF
-    for b in data:
-        crc ^= b
-        for _ in range(8):
-            crc = (crc >> 1) ^ 0xA001 if (crc & 1) else (crc >> 1)
-    return crc & 0xFFFF
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Sequence, TypeVar
+
+from .metrics import (
+    CONNECTION_ERRORS,
+    CRC_ERRORS,
+    FRAME_ERRORS,
+    MODBUS_EXCEPTIONS,
+    RECONNECTS,
+    TIMEOUTS,
+    ClientMetrics,
+)
+from .rtu_codec import (
+    FUNC_READ_HOLDING,
+    CrcError,
+    FrameError,
+    ModbusExceptionError,
+    RtuFrameProtocol,
+    build_read_request,
+    build_write_request,
+    parse_read_response,
+    parse_write_response,
+)
+
+if TYPE_CHECKING:
+    from .capture import FrameRecorder
+
+_T = TypeVar("_T")
+
+
+class FairLock:
+    """Lock that is handed out round-robin across unit IDs.
+
+    Waiters are queued per unit, and on release the lock goes to the next
+    unit in line rather than to the oldest waiter overall, so one device
+    with many queued reads cannot starve the others on a shared gateway.
+    Priority holders (writes) are served before all of them, in order.
+    """
+
+    def __init__(self) -> None:
+        self._locked = False
+        self._waiters: dict[int, deque[asyncio.Future[None]]] = {}
+        self._ready: deque[int] = deque()
+        self._urgent: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def locked(self) -> bool:
+        return self._locked
+
+    @asynccontextmanager
+    async def hold(self, unit: int, priority: bool = False) -> AsyncIterator[None]:
+        await self._acquire(unit, priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, unit: int, priority: bool = False) -> None:
+        if not self._locked and not self._ready and not self._urgent:
+            self._locked = True
+            return
+        fut: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        if priority:
+            queue = self._urgent
+            queue.append(fut)
+        else:
+            queue = self._waiters.setdefault(unit, deque())
+            queue.append(fut)
+            if unit not in self._ready:
+                self._ready.append(unit)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Granted and cancelled at the same time; pass it on.
+                self._release()
+            elif fut in queue:
+                # _release() may already have dropped it as cancelled
+                queue.remove(fut)
+                if not priority and not queue and unit in self._ready:
+                    self._ready.remove(unit)
+            raise
+
+    def _release(self) -> None:
+        while self._urgent:
+            fut = self._urgent.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        while self._ready:
+            unit = self._ready.popleft()
+            queue = self._waiters[unit]
+            fut = queue.popleft()
+            if queue:
+                self._ready.append(unit)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._locked = False
+
 
 @dataclass
 class RtuOverTcpClient:
+    """Modbus RTU-over-TCP client holding one long-lived connection.
+
+    The connection is opened lazily on the first request, reused for every
+    following request and dropped on any I/O or protocol error so the next
+    request reconnects. Requests are serialized because RTU framing has no
+    transaction IDs; when several devices share the gateway the connection
+    is granted to their unit IDs in turn. After `idle_timeout` seconds without
+    traffic the connection is closed to free the dongle's socket slot.
+    """
+
     host: str
     port: int
     timeout: float = 3.0
+    idle_timeout: float = 60.0
+
+    _protocol: RtuFrameProtocol | None = field(default=None, init=False, repr=False)
+    _lock: FairLock = field(default_factory=FairLock, init=False, repr=False)
+    _idle_handle: asyncio.TimerHandle | None = field(default=None, init=False, repr=False)
+    metrics: ClientMetrics = field(default_factory=ClientMetrics, init=False, repr=False)
+    # Set to log every request and response
+    recorder: FrameRecorder | None = field(default=None, init=False, repr=False)
+
+    @property
+    def connected(self) -> bool:
+        return self._protocol is not None and self._protocol.transport is not None
+
+    async def _ensure_connected(self) -> RtuFrameProtocol:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if not self.connected:
+            self._drop()
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            transport, protocol = await asyncio.wait_for(
+                loop.create_connection(RtuFrameProtocol, self.host, self.port), self.timeout
+            )
+            if self.metrics.connect.count:
+                self.metrics.counters[RECONNECTS] += 1
+            self.metrics.connect.record(time.perf_counter() - start)
+            sock = transport.get_extra_info("socket")
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            self._protocol = protocol
+        return self._protocol
+
+    def _drop(self) -> None:
+        """Forget the current connection without waiting for it to close."""
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if self._protocol is not None and self._protocol.transport is not None:
+            self._protocol.transport.close()
+        self._protocol = None
+
+    def _arm_idle_timer(self) -> None:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+        if self.idle_timeout > 0:
+            self._idle_handle = asyncio.get_running_loop().call_later(self.idle_timeout, self._drop)
+
+    async def close(self) -> None:
+        """Close the connection, e.g. when the config entry is unloaded."""
+        async with self._lock.hold(-1):
+            self._drop()
+
+    async def read_holding_registers_raw(self, unit: int, address: int, count: int) -> bytes:
+        """Read registers and return their payload as big-endian bytes."""
+        func = FUNC_READ_HOLDING
+        frame = build_read_request(unit, func, address, count)
+        # The response view points into the protocol's receive buffer, so it
+        # is copied out before the lock is released.
+        return await self._request(unit, frame, lambda resp: bytes(parse_read_response(resp, unit, func, count)))
+
+    async def write_registers(self, unit: int, address: int, values: Sequence[int]) -> None:
+        """Write one (0x06) or more (0x10) consecutive holding registers.
+
+        Writes jump the queue of pending reads, so they wait for at most the
+        request currently on the wire.
+        """
+        frame = build_write_request(unit, address, tuple(values))
+        await self._request(unit, frame, lambda resp: parse_write_response(resp, frame), priority=True)
+
+    async def _request(
+        self, unit: int, frame: bytes, decode: Callable[[memoryview], _T], priority: bool = False
+    ) -> _T:
+        async with self._lock.hold(unit, priority):
+            # Valid response without unit ID and CRC, for the recorder
+            response: memoryview | bytes = b""
+            cancelled = False
+            try:
+                protocol = await self._ensure_connected()
+                start = time.perf_counter()
+                exchange = asyncio.ensure_future(protocol.request(frame, self.timeout))
+                while not exchange.done():
+                    try:
+                        await asyncio.wait((exchange,))
+                    except asyncio.CancelledError:
+                        # E.g. the poll cycle ran out of time. The request is
+                        # on the wire, so wait for its answer (at most the
+                        # timeout) rather than reconnect to resynchronise.
+                        cancelled = True
+                resp = exchange.result()
+                result = decode(resp)
+                response = resp[1:-2]
+            except ModbusExceptionError:
+                # A well-formed answer; the connection is fine.
+                response = resp[1:-2]
+                self.metrics.record_request(None, MODBUS_EXCEPTIONS)
+                self._arm_idle_timer()
+                raise
+            except FrameError as err:
+                # The stream may be out of sync now; start over next time.
+                self.metrics.record_request(None, CRC_ERRORS if isinstance(err, CrcError) else FRAME_ERRORS)
+                self._drop()
+                raise
+            except (OSError, asyncio.TimeoutError) as err:
+                self.metrics.record_request(
+                    None, TIMEOUTS if isinstance(err, asyncio.TimeoutError) else CONNECTION_ERRORS
+                )
+                self._drop()
+                raise IOError(f"Connection to {self.host}:{self.port} failed: {err!r}") from err
+            except asyncio.CancelledError:
+                # Cancelled while connecting
+                self._drop()
+                raise
+            else:
+                self.metrics.record_request(time.perf_counter() - start)
+                self._arm_idle_timer()
+            finally:
+                if self.recorder is not None:
+                    self.recorder.record(unit, memoryview(frame)[1:-2], response)
+                if cancelled:
+                    # The caller was cancelled; that wins over the result
+                    raise asyncio.CancelledError
 
-    async def read_holding_registers(self, unit: int, address: int, count: int) -> list[int]:
-        # Build RTU frame: [unit][func=0x03][addrHi addrLo][countHi countLo][crcLo crcHi]
-        func = 0x03
-        pdu = struct.pack(">B B H H", unit, func, address, count)
-        frame = pdu + struct.pack("<H", crc16_modbus(pdu))
-
-        def _io() -> bytes:
-            with socket.create_connection((self.host, self.port), timeout=self.timeout) as s:
-                s.sendall(frame)
-                # Read enough. Server responses are tiny.
-                return s.recv(4096)
-
-        resp = await asyncio.to_thread(_io)
-        if len(resp) < 5:
-            raise IOError(f"Short response ({len(resp)} bytes)")
-
-        # Basic parse: [unit][func][bytecount][data...][crc]
-        if resp[0] != unit:
-            raise IOError(f"Unit mismatch: got {resp[0]} expected {unit}")
-        if resp[1] & 0x80:
-            exc = resp[2]
-            raise IOError(f"Modbus exception {exc:#02x}")
-        if resp[1] != func:
-            raise IOError(f"Function mismatch: got {resp[1]} expected {func}")
-
-        bytecount = resp[2]
-        data = resp[3:3 + bytecount]
-        if len(data) != bytecount:
-            raise IOError("Truncated payload")
-
-        regs = [int.from_bytes(data[i:i+2], "big") for i in range(0, len(data), 2)]
-        return regs
-
-def regs_to_s32_be(regs: Sequence[int]) -> int:
-    """Big-endian pair (hi, lo), signed 32-bit."""
-    if len(regs) < 2:
-        raise ValueError("Need 2 registers")
-    b = regs[0].to_bytes(2, "big") + regs[1].to_bytes(2, "big")
-    return int.from_bytes(b, "big", signed=True)
-
-
-def regs_to_u32_be(regs: Sequence[int]) -> int:
-    """Big-endian pair (hi, lo), unsigned 32-bit."""
-    if len(regs) < 2:
-        raise ValueError("Need 2 registers")
-    b = regs[0].to_bytes(2, "big") + regs[1].to_bytes(2, "big")
-    return int.from_bytes(b, "big", signed=False)
-
-
-def regs_to_s16(reg: int) -> int:
-    """Convert unsigned 16-bit register to signed 16-bit."""
-    if reg >= 0x8000:
-        return reg - 0x10000
-    return reg
\ No newline at end of file
+        return result
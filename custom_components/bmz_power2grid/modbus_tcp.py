@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import asyncio
+import socket
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from .metrics import (
+    CONNECTION_ERRORS,
+    FRAME_ERRORS,
+    MODBUS_EXCEPTIONS,
+    RECONNECTS,
+    TIMEOUTS,
+    ClientMetrics,
+)
+from .rtu_codec import (
+    FUNC_READ_HOLDING,
+    FUNC_WRITE_MULTIPLE,
+    FUNC_WRITE_SINGLE,
+    MAX_WRITE_REGISTERS,
+    FrameError,
+    ModbusExceptionError,
+)
+
+if TYPE_CHECKING:
+    from .capture import FrameRecorder
+
+# [transaction id][protocol id = 0][length of unit + PDU][unit]
+MBAP = struct.Struct(">HHHB")
+MBAP_HEADER_LEN = MBAP.size
+# Largest Modbus TCP ADU: MBAP header plus a 253-byte PDU
+MAX_ADU_LEN = MBAP_HEADER_LEN + 253
+
+# Requests a gateway is asked to work on at the same time
+DEFAULT_MAX_IN_FLIGHT = 4
+
+
+def build_read_pdu(address: int, count: int) -> bytes:
+    return struct.pack(">BHH", FUNC_READ_HOLDING, address, count)
+
+
+def build_write_pdu(address: int, values: tuple[int, ...]) -> bytes:
+    if len(values) == 1:
+        return struct.pack(">BHH", FUNC_WRITE_SINGLE, address, values[0])
+    if not 1 <= len(values) <= MAX_WRITE_REGISTERS:
+        raise ValueError(f"Cannot write {len(values)} registers in one request")
+    return struct.pack(
+        f">BHHB{len(values)}H", FUNC_WRITE_MULTIPLE, address, len(values), 2 * len(values), *values
+    )
+
+
+def check_response_pdu(pdu: bytes, request: bytes) -> None:
+    """Validate a response PDU against the request PDU it answers."""
+    if len(pdu) < 2:
+        raise FrameError(f"Truncated {len(pdu)}-byte response")
+    if pdu[0] & 0x80:
+        raise ModbusExceptionError(pdu[1])
+    if pdu[0] != request[0]:
+        raise FrameError(f"Function mismatch: got {pdu[0]} expected {request[0]}")
+    if request[0] == FUNC_READ_HOLDING:
+        count = struct.unpack_from(">H", request, 3)[0]
+        if pdu[1] != count * 2 or len(pdu) != 2 + count * 2:
+            raise FrameError(f"Byte count mismatch: got {pdu[1]} expected {count * 2}")
+    elif pdu[:5] != request[:5]:
+        # 0x06 echoes address and value, 0x10 address and count
+        raise FrameError("Write response does not match the request")
+
+
+class MbapProtocol(asyncio.Protocol):
+    """Match Modbus TCP responses to outstanding requests by transaction ID.
+
+    Responses may arrive in any order and split or coalesced across TCP
+    segments; every complete ADU in the receive buffer resolves the waiter
+    registered for its transaction ID. Responses nobody waits for anymore
+    (the request timed out) are dropped.
+    """
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._waiters: dict[int, asyncio.Future[tuple[int, bytes]]] = {}
+        self.transport: asyncio.Transport | None = None
+        self.last_received = 0.0
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.transport = None
+        self._fail_all(exc or ConnectionResetError("Connection closed by peer"))
+
+    def data_received(self, data: bytes) -> None:
+        self.last_received = time.monotonic()
+        buf = self._buf
+        buf += data
+        while len(buf) >= MBAP_HEADER_LEN:
+            tid, protocol_id, length, unit = MBAP.unpack_from(buf)
+            if protocol_id != 0 or not 2 <= length <= MAX_ADU_LEN - 6:
+                self._fail_all(FrameError(f"Malformed MBAP header {bytes(buf[:MBAP_HEADER_LEN]).hex()}"))
+                if self.transport is not None:
+                    self.transport.close()
+                return
+            end = 6 + length
+            if len(buf) < end:
+                return
+            pdu = bytes(buf[MBAP_HEADER_LEN:end])
+            del buf[:end]
+            waiter = self._waiters.pop(tid, None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result((unit, pdu))
+
+    def _fail_all(self, exc: BaseException) -> None:
+        waiters, self._waiters = self._waiters, {}
+        for waiter in waiters.values():
+            if not waiter.done():
+                waiter.set_exception(exc)
+
+    async def request(self, tid: int, unit: int, pdu: bytes, timeout: float) -> tuple[int, bytes]:
+        if self.transport is None or self.transport.is_closing():
+            raise ConnectionResetError("Not connected")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[tid] = waiter
+        self.transport.write(MBAP.pack(tid, 0, len(pdu) + 1, unit) + pdu)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        finally:
+            self._waiters.pop(tid, None)
+
+
+@dataclass
+class ModbusTcpClient:
+    """Modbus TCP (MBAP) client pipelining requests over one connection.
+
+    Up to `max_in_flight` requests are outstanding at once and answered in
+    whatever order the gateway finishes them, so a cycle of N block reads
+    costs about one round trip instead of N. Writes do not wait for a free
+    slot. Same interface as RtuOverTcpClient.
+    """
+
+    host: str
+    port: int
+    timeout: float = 3.0
+    idle_timeout: float = 60.0
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+
+    _protocol: MbapProtocol | None = field(default=None, init=False, repr=False)
+    _connect_lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False, repr=False)
+    _slots: asyncio.Semaphore = field(init=False, repr=False)
+    _in_flight: int = field(default=0, init=False, repr=False)
+    _next_tid: int = field(default=0, init=False, repr=False)
+    _idle_handle: asyncio.TimerHandle | None = field(default=None, init=False, repr=False)
+    metrics: ClientMetrics = field(default_factory=ClientMetrics, init=False, repr=False)
+    # Set to log every request and response
+    recorder: FrameRecorder | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+
+    @property
+    def connected(self) -> bool:
+        return self._protocol is not None and self._protocol.transport is not None
+
+    async def _ensure_connected(self) -> MbapProtocol:
+        async with self._connect_lock:
+            if not self.connected:
+                self._drop()
+                loop = asyncio.get_running_loop()
+                start = time.perf_counter()
+                transport, protocol = await asyncio.wait_for(
+                    loop.create_connection(MbapProtocol, self.host, self.port), self.timeout
+                )
+                if self.metrics.connect.count:
+                    self.metrics.counters[RECONNECTS] += 1
+                self.metrics.connect.record(time.perf_counter() - start)
+                sock = transport.get_extra_info("socket")
+                if sock is not None:
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                self._protocol = protocol
+            return self._protocol
+
+    def _drop(self) -> None:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if self._protocol is not None and self._protocol.transport is not None:
+            self._protocol.transport.close()
+        self._protocol = None
+
+    def _arm_idle_timer(self) -> None:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if self.idle_timeout > 0 and not self._in_flight:
+            self._idle_handle = asyncio.get_running_loop().call_later(self.idle_timeout, self._drop)
+
+    async def close(self) -> None:
+        """Close the connection, e.g. when the config entry is unloaded."""
+        self._drop()
+
+    async def read_holding_registers_raw(self, unit: int, address: int, count: int) -> bytes:
+        """Read registers and return their payload as big-endian bytes."""
+        request = build_read_pdu(address, count)
+        async with self._slots:
+            pdu = await self._request(unit, request)
+        return pdu[2:]
+
+    async def write_registers(self, unit: int, address: int, values: tuple[int, ...] | list[int]) -> None:
+        """Write one (0x06) or more (0x10) consecutive holding registers."""
+        # Writes skip the in-flight limit so they never queue behind reads
+        await self._request(unit, build_write_pdu(address, tuple(values)))
+
+    async def _request(self, unit: int, request: bytes) -> bytes:
+        self._next_tid = tid = (self._next_tid + 1) & 0xFFFF
+        self._in_flight += 1
+        # Valid response PDU, for the recorder
+        response = b""
+        try:
+            if self._idle_handle is not None:
+                self._idle_handle.cancel()
+                self._idle_handle = None
+            try:
+                protocol = await self._ensure_connected()
+                start = time.perf_counter()
+                resp_unit, pdu = await protocol.request(tid, unit, request, self.timeout)
+                if resp_unit != unit:
+                    raise FrameError(f"Unit mismatch: got {resp_unit} expected {unit}")
+                check_response_pdu(pdu, request)
+                response = pdu
+            except ModbusExceptionError:
+                response = pdu
+                self.metrics.record_request(None, MODBUS_EXCEPTIONS)
+                raise
+            except FrameError:
+                self.metrics.record_request(None, FRAME_ERRORS)
+                raise
+            except (OSError, asyncio.TimeoutError) as err:
+                timed_out = isinstance(err, asyncio.TimeoutError)
+                self.metrics.record_request(None, TIMEOUTS if timed_out else CONNECTION_ERRORS)
+                # A lost response does not desync MBAP framing; only give up
+                # on the connection when the gateway has gone silent.
+                if not timed_out or (
+                    self._protocol is not None and time.monotonic() - self._protocol.last_received > self.timeout
+                ):
+                    self._drop()
+                raise IOError(f"Connection to {self.host}:{self.port} failed: {err!r}") from err
+            self.metrics.record_request(time.perf_counter() - start)
+            return pdu
+        finally:
+            if self.recorder is not None:
+                self.recorder.record(unit, request, response)
+            self._in_flight -= 1
+            if self.connected:
+                self._arm_idle_timer()
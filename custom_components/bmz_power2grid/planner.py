@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable
+
+from .const import DEFAULT_MAX_GAP, MAX_REGISTERS_PER_REQUEST
+
+
+@dataclass(frozen=True)
+class ReadBlock:
+    """One contiguous holding-register read."""
+
+    address: int
+    count: int
+
+    @property
+    def end(self) -> int:
+        return self.address + self.count
+
+    def covers(self, address: int, count: int) -> bool:
+        return self.address <= address and address + count <= self.end
+
+
+def plan_reads(
+    spans: Iterable[tuple[int, int]],
+    max_gap: int = DEFAULT_MAX_GAP,
+    max_count: int = MAX_REGISTERS_PER_REQUEST,
+) -> tuple[ReadBlock, ...]:
+    """Merge (address, count) spans into as few block reads as possible.
+
+    Neighbouring spans are merged when at most `max_gap` unused registers lie
+    between them and the resulting block stays within `max_count` registers.
+    A span is never split across two blocks, so multi-register values always
+    come from a single response. Plans are cached per input.
+    """
+    return _plan(tuple(sorted(set(spans))), max_gap, max_count)
+
+
+@lru_cache(maxsize=32)
+def _plan(spans: tuple[tuple[int, int], ...], max_gap: int, max_count: int) -> tuple[ReadBlock, ...]:
+    blocks: list[ReadBlock] = []
+    start = end = None
+    for address, count in spans:
+        if count > max_count:
+            raise ValueError(f"Span at {address} has {count} registers, limit is {max_count}")
+        if start is not None and address - end <= max_gap and max(end, address + count) - start <= max_count:
+            end = max(end, address + count)
+            continue
+        if start is not None:
+            blocks.append(ReadBlock(start, end - start))
+        start, end = address, address + count
+    if start is not None:
+        blocks.append(ReadBlock(start, end - start))
+    return tuple(blocks)
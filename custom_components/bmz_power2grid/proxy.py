@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import struct
+import time
+from typing import TYPE_CHECKING
+
+from .const import DOMAIN, MAX_REGISTERS_PER_REQUEST
+from .modbus_tcp import MBAP, MBAP_HEADER_LEN, MAX_ADU_LEN
+from .rtu_codec import (
+    FUNC_READ_HOLDING,
+    FUNC_WRITE_MULTIPLE,
+    FUNC_WRITE_SINGLE,
+    MAX_WRITE_REGISTERS,
+    ModbusExceptionError,
+    check_crc,
+    crc16_modbus,
+)
+
+if TYPE_CHECKING:
+    from .coordinator import BmzCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+_ADDRESS_COUNT = struct.Struct(">HH")
+
+# Exception codes sent to proxy clients
+_ILLEGAL_FUNCTION = 0x01
+_ILLEGAL_DATA_VALUE = 0x03
+_GATEWAY_TARGET_FAILED = 0x0B
+
+# Shortest request in either framing: an RTU read or single write
+_MIN_REQUEST = 8
+
+
+def _exception(func: int, code: int) -> bytes:
+    return bytes((func | 0x80, code))
+
+
+def _is_mbap(head: bytes) -> bool:
+    """Whether the first bytes of a connection start a Modbus TCP request.
+
+    An MBAP header carries protocol ID 0 and a plausible length; an RTU
+    read or single write is exactly 8 bytes with a valid CRC.
+    """
+    length = head[4] << 8 | head[5]
+    return head[2:4] == b"\x00\x00" and 2 <= length <= MAX_ADU_LEN - 6 and not check_crc(head)
+
+
+class ModbusProxy:
+    """Local Modbus server that shares the entry's gateway connection.
+
+    Other tools (evcc, a second dashboard) connect here instead of to the
+    dongle, which only accepts a few connections. Each client may speak
+    RTU-over-TCP or Modbus TCP; the framing is recognised from its first
+    request. Reads of registers the integration read within `ttl` seconds
+    are answered from the register cache. Everything else goes to the
+    gateway through the shared client, one request per proxy connection at
+    a time, so consumers take turns with each other and with the poll.
+    Identical reads that are in flight at the same time reach the device
+    once. Clients are not authenticated, so writes are refused unless
+    `allow_writes` is set; allowed writes go through the command queue,
+    like the integration's own, and are read back on the next poll.
+    """
+
+    def __init__(
+        self, coordinator: BmzCoordinator, host: str, port: int, ttl: float, allow_writes: bool = False
+    ) -> None:
+        self.coordinator = coordinator
+        self.host = host
+        self.port = port
+        self.ttl = ttl
+        self.allow_writes = allow_writes
+        self._server: asyncio.Server | None = None
+        self._clients: set[asyncio.StreamWriter] = set()
+        # Reads on their way to the device, by (unit, address, count)
+        self._reads: dict[tuple[int, int, int], asyncio.Task[bytes]] = {}
+        self.requests = 0
+        self.cache_hits = 0
+        self.shared_reads = 0
+        self.forwarded = 0
+        self.refused_writes = 0
+        self.errors = 0
+
+    async def async_start(self) -> None:
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as err:
+            _LOGGER.error("Cannot serve the Modbus proxy on %s:%s: %s", self.host, self.port, err)
+
+    async def async_stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._clients):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._clients.add(writer)
+        try:
+            head = await reader.readexactly(_MIN_REQUEST)
+            if _is_mbap(head):
+                await self._serve_tcp(reader, writer, head)
+            else:
+                await self._serve_rtu(reader, writer, head)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _serve_rtu(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, frame: bytes) -> None:
+        while True:
+            if frame[1] == FUNC_WRITE_MULTIPLE:
+                # [unit][func][address][count][byte count][values][crc]
+                frame += await reader.readexactly(7 + frame[6] + 2 - _MIN_REQUEST)
+            if not check_crc(frame):
+                # Without a valid frame the stream cannot be resynchronised
+                _LOGGER.debug("Closing proxy connection after bad RTU frame %s", frame.hex())
+                return
+            unit = frame[0]
+            reply = bytes((unit,)) + await self._answer(unit, frame[1:-2])
+            writer.write(reply + struct.pack("<H", crc16_modbus(reply)))
+            await writer.drain()
+            frame = await reader.readexactly(_MIN_REQUEST)
+
+    async def _serve_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, head: bytes) -> None:
+        header, pdu = head[:MBAP_HEADER_LEN], head[MBAP_HEADER_LEN:]
+        while True:
+            tid, protocol_id, length, unit = MBAP.unpack(header)
+            if protocol_id != 0 or not 2 <= length <= MAX_ADU_LEN - 6:
+                _LOGGER.debug("Closing proxy connection after bad MBAP header %s", header.hex())
+                return
+            pdu += await reader.readexactly(length - 1 - len(pdu))
+            reply = await self._answer(unit, pdu)
+            writer.write(MBAP.pack(tid, 0, len(reply) + 1, unit) + reply)
+            await writer.drain()
+            header, pdu = await reader.readexactly(MBAP_HEADER_LEN), b""
+
+    async def _answer(self, unit: int, pdu: bytes) -> bytes:
+        """Response PDU for a request PDU."""
+        self.requests += 1
+        func = pdu[0]
+        try:
+            if func == FUNC_READ_HOLDING and len(pdu) == 5:
+                address, count = _ADDRESS_COUNT.unpack_from(pdu, 1)
+                if not 1 <= count <= MAX_REGISTERS_PER_REQUEST:
+                    return _exception(func, _ILLEGAL_DATA_VALUE)
+                return bytes((func, 2 * count)) + await self._read(unit, address, count)
+            if func == FUNC_WRITE_SINGLE and len(pdu) == 5:
+                address, value = _ADDRESS_COUNT.unpack_from(pdu, 1)
+                values: tuple[int, ...] = (value,)
+            elif func == FUNC_WRITE_MULTIPLE and len(pdu) >= 6:
+                address, count = _ADDRESS_COUNT.unpack_from(pdu, 1)
+                if not 1 <= count <= MAX_WRITE_REGISTERS or pdu[5] != 2 * count or len(pdu) != 6 + 2 * count:
+                    return _exception(func, _ILLEGAL_DATA_VALUE)
+                values = struct.unpack_from(f">{count}H", pdu, 6)
+            else:
+                return _exception(func, _ILLEGAL_FUNCTION)
+            if not self.allow_writes:
+                self.refused_writes += 1
+                return _exception(func, _ILLEGAL_FUNCTION)
+            await self._write(unit, address, values)
+            # 0x06 echoes address and value, 0x10 address and count
+            return pdu[:5]
+        except ModbusExceptionError as err:
+            return _exception(func, err.code)
+        except IOError as err:
+            self.errors += 1
+            _LOGGER.debug("Proxied request %s for unit %s failed: %s", pdu.hex(), unit, err)
+            return _exception(func, _GATEWAY_TARGET_FAILED)
+
+    async def _read(self, unit: int, address: int, count: int) -> bytes:
+        raw = self.coordinator.registers.get(unit, address, count, self.ttl, time.monotonic())
+        if raw is not None:
+            self.cache_hits += 1
+            return raw
+        key = (unit, address, count)
+        task = self._reads.get(key)
+        if task is None:
+            task = self._reads[key] = self.coordinator.hass.async_create_background_task(
+                self._forward_read(unit, address, count), f"{DOMAIN} proxied read"
+            )
+            task.add_done_callback(lambda _task: self._reads.pop(key, None))
+        else:
+            self.shared_reads += 1
+        # A consumer hanging up must not cancel the read for the others
+        return await asyncio.shield(task)
+
+    async def _forward_read(self, unit: int, address: int, count: int) -> bytes:
+        self.forwarded += 1
+        # Only the registers the cache lacks are read
+        return await self.coordinator.async_read_registers(unit, address, count, self.ttl)
+
+    async def _write(self, unit: int, address: int, values: tuple[int, ...]) -> None:
+        self.forwarded += 1
+        # Coalesced with other writes to the register and read back
+        await self.coordinator.async_write_registers(unit, address, values)
+
+    def as_dict(self) -> dict:
+        return {
+            "port": self.port,
+            "ttl": self.ttl,
+            "allow_writes": self.allow_writes,
+            "serving": self._server is not None,
+            "clients": len(self._clients),
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "shared_reads": self.shared_reads,
+            "forwarded": self.forwarded,
+            "refused_writes": self.refused_writes,
+            "errors": self.errors,
+        }
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable
+
+from .const import (
+    TIER_FAST,
+    TIER_MEDIUM,
+    TIER_SLOW,
+    # Register addresses
+    REG_PV_POWER_KW_U32,
+    REG_BATTERY_POWER_KW_I32,
+    REG_BATTERY_VOLTAGE_U16,
+    REG_BATTERY_CURRENT_I16,
+    REG_BATTERY_SOC_U16,
+    REG_BATTERY_SOH_U16,
+    REG_GRID_METER_L1_KW_I32,
+    REG_GRID_METER_L2_KW_I32,
+    REG_GRID_METER_L3_KW_I32,
+    REG_GRID_METER_TOTAL_KW_I32,
+    REG_GRID_L1_VOLTAGE_U16,
+    REG_GRID_L1_CURRENT_U16,
+    REG_GRID_L2_VOLTAGE_U16,
+    REG_GRID_L2_CURRENT_U16,
+    REG_GRID_L3_VOLTAGE_U16,
+    REG_GRID_L3_CURRENT_U16,
+    REG_GRID_FREQUENCY_U16,
+    REG_INVERTER_TEMP_I16,
+    REG_BATTERY_TEMP_U16,
+    # Native energy counters
+    REG_TOTAL_GRID_EXPORT_U32,
+    REG_TOTAL_GRID_IMPORT_U32,
+    REG_TOTAL_BATTERY_CHARGE_U32,
+    REG_TOTAL_BATTERY_DISCHARGE_U32,
+    REG_TOTAL_PV_GENERATION_U32,
+    REG_TOTAL_LOAD_U32,
+    REG_DAILY_GRID_EXPORT_U16,
+    REG_DAILY_GRID_IMPORT_U16,
+    REG_DAILY_BATTERY_CHARGE_U16,
+    REG_DAILY_BATTERY_DISCHARGE_U16,
+    REG_DAILY_PV_GENERATION_U16,
+    REG_DAILY_LOAD_U16,
+    # Control
+    REG_GRID_INJECTION_LIMIT_SWITCH_U16,
+    REG_GRID_INJECTION_LIMIT_U16,
+    REG_WORKING_MODE_U16,
+    REG_BATTERY_POWER_SET_I32,
+    # Scaling
+    SCALE_VOLTAGE,
+    SCALE_CURRENT,
+    SCALE_FREQUENCY,
+    SCALE_TEMPERATURE,
+    SCALE_PERCENT,
+    SCALE_ENERGY_10,
+)
+from .planner import ReadBlock, plan_reads
+
+# Register value types as big-endian struct codes (32-bit values are hi word first)
+U16 = "H"
+I16 = "h"
+U32 = "I"
+I32 = "i"
+
+_REGISTER_COUNT = {U16: 1, I16: 1, U32: 2, I32: 2}
+_LIMITS = {U16: (0, 0xFFFF), I16: (-0x8000, 0x7FFF), U32: (0, 0xFFFFFFFF), I32: (-0x80000000, 0x7FFFFFFF)}
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """One decoded value: where it lives, its type and how to scale it."""
+
+    key: str
+    address: int
+    type: str
+    scale: float = 1
+    digits: int | None = None
+
+    @property
+    def count(self) -> int:
+        return _REGISTER_COUNT[self.type]
+
+    @property
+    def span(self) -> tuple[int, int]:
+        return (self.address, self.count)
+
+    def encode(self, value: float) -> tuple[int, ...]:
+        """Register words that make the device report `value` for this field."""
+        raw = round(value / self.scale)
+        low, high = _LIMITS[self.type]
+        if not low <= raw <= high:
+            raise ValueError(f"{value} is out of range for {self.key}")
+        packed = struct.pack(">" + self.type, raw)
+        return struct.unpack(f">{self.count}H", packed)
+
+
+@dataclass(frozen=True)
+class RegisterGroup:
+    """Fields that are read together at one polling tier.
+
+    `derive` computes the `derived` keys from the group's freshly decoded
+    values.
+    """
+
+    name: str
+    tier: str
+    fields: tuple[FieldSpec, ...]
+    derive: Callable[[dict], None] | None = None
+    derived: tuple[str, ...] = ()
+
+    @property
+    def spans(self) -> tuple[tuple[int, int], ...]:
+        return tuple(f.span for f in self.fields)
+
+    @property
+    def keys(self) -> tuple[str, ...]:
+        return tuple(f.key for f in self.fields) + self.derived
+
+
+class BlockDecoder:
+    """Decode every field of one block read with a single struct call."""
+
+    __slots__ = ("_struct", "_fields", "keys")
+
+    def __init__(self, block: ReadBlock, fields: tuple[FieldSpec, ...]) -> None:
+        fmt = [">"]
+        position = block.address
+        for f in sorted(fields, key=lambda f: f.address):
+            if f.address < position or f.address + f.count > block.end:
+                raise ValueError(f"Field {f.key} does not fit block at {block.address}")
+            if f.address > position:
+                fmt.append(f"{(f.address - position) * 2}x")
+            fmt.append(f.type)
+            position = f.address + f.count
+        if position < block.end:
+            fmt.append(f"{(block.end - position) * 2}x")
+        self._struct = struct.Struct("".join(fmt))
+        self._fields = tuple(
+            (f.key, f.scale, f.digits) for f in sorted(fields, key=lambda f: f.address)
+        )
+        self.keys = frozenset(f.key for f in fields)
+
+    def decode(self, buffer: bytes | bytearray | memoryview, data: dict) -> None:
+        """Unpack the raw register bytes of the block into `data`."""
+        for (key, scale, digits), raw in zip(self._fields, self._struct.unpack_from(buffer)):
+            if scale != 1:
+                raw = raw * scale
+            data[key] = raw if digits is None else round(raw, digits)
+
+    def decode_columns(self, buffer: bytes | bytearray | memoryview) -> dict[str, list]:
+        """Unpack back-to-back copies of the block into one list per field."""
+        columns: dict[str, list] = {}
+        for (key, scale, digits), raw in zip(self._fields, zip(*self._struct.iter_unpack(buffer))):
+            if scale != 1:
+                raw = [value * scale for value in raw]
+            columns[key] = list(raw) if digits is None else [round(value, digits) for value in raw]
+        return columns
+
+
+@lru_cache(maxsize=64)
+def compile_block(block: ReadBlock, fields: tuple[FieldSpec, ...]) -> BlockDecoder:
+    return BlockDecoder(block, fields)
+
+
+def _derive_battery_flow(data: dict) -> None:
+    # positive=discharge, negative=charge
+    battery_power_w = data.get("battery_power_w")
+    if battery_power_w is None:
+        return
+    data["battery_charge_w"] = max(0, -battery_power_w)
+    data["battery_discharge_w"] = max(0, battery_power_w)
+
+
+def _derive_grid_flow(data: dict) -> None:
+    # positive meter = exporting, negative meter = importing
+    grid_power_total_w = data.get("grid_power_total_w")
+    if grid_power_total_w is None:
+        return
+    data["grid_import_w"] = max(0, -grid_power_total_w)
+    data["grid_export_w"] = max(0, grid_power_total_w)
+
+
+# Every value decoded by the coordinator, grouped by how fast it changes.
+# Power registers are kW with /1000 scaling, i.e. the raw value is already W.
+REGISTER_GROUPS: tuple[RegisterGroup, ...] = (
+    # Power readings drive load control: every cycle
+    RegisterGroup("pv_power", TIER_FAST, (
+        FieldSpec("pv_power_w", REG_PV_POWER_KW_U32, U32),
+    )),
+    RegisterGroup("battery_power", TIER_FAST, (
+        FieldSpec("battery_power_w", REG_BATTERY_POWER_KW_I32, I32),
+    ), derive=_derive_battery_flow, derived=("battery_charge_w", "battery_discharge_w")),
+    RegisterGroup("grid_power", TIER_FAST, (
+        FieldSpec("grid_l1_w", REG_GRID_METER_L1_KW_I32, I32),
+        FieldSpec("grid_l2_w", REG_GRID_METER_L2_KW_I32, I32),
+        FieldSpec("grid_l3_w", REG_GRID_METER_L3_KW_I32, I32),
+        FieldSpec("grid_power_total_w", REG_GRID_METER_TOTAL_KW_I32, I32),
+    ), derive=_derive_grid_flow, derived=("grid_import_w", "grid_export_w")),
+
+    # Electrical state that moves on a scale of seconds to minutes
+    RegisterGroup("battery_vi", TIER_MEDIUM, (
+        FieldSpec("battery_voltage", REG_BATTERY_VOLTAGE_U16, U16, SCALE_VOLTAGE, 1),
+        FieldSpec("battery_current", REG_BATTERY_CURRENT_I16, I16, SCALE_CURRENT, 1),
+    )),
+    RegisterGroup("battery_soc", TIER_MEDIUM, (
+        FieldSpec("battery_soc_pct", REG_BATTERY_SOC_U16, U16, SCALE_PERCENT, 2),
+    )),
+    RegisterGroup("grid_vaf", TIER_MEDIUM, (
+        FieldSpec("grid_l1_v", REG_GRID_L1_VOLTAGE_U16, U16, SCALE_VOLTAGE, 1),
+        FieldSpec("grid_l1_a", REG_GRID_L1_CURRENT_U16, U16, SCALE_CURRENT, 2),
+        FieldSpec("grid_l2_v", REG_GRID_L2_VOLTAGE_U16, U16, SCALE_VOLTAGE, 1),
+        FieldSpec("grid_l2_a", REG_GRID_L2_CURRENT_U16, U16, SCALE_CURRENT, 2),
+        FieldSpec("grid_l3_v", REG_GRID_L3_VOLTAGE_U16, U16, SCALE_VOLTAGE, 1),
+        FieldSpec("grid_l3_a", REG_GRID_L3_CURRENT_U16, U16, SCALE_CURRENT, 2),
+        FieldSpec("grid_frequency", REG_GRID_FREQUENCY_U16, U16, SCALE_FREQUENCY, 2),
+    )),
+    RegisterGroup("temperatures", TIER_MEDIUM, (
+        FieldSpec("inverter_temp_c", REG_INVERTER_TEMP_I16, I16, SCALE_TEMPERATURE, 1),
+        FieldSpec("battery_temp_c", REG_BATTERY_TEMP_U16, U16, SCALE_TEMPERATURE, 1),
+    )),
+
+    # Counters and health
+    RegisterGroup("battery_soh", TIER_SLOW, (
+        FieldSpec("battery_soh_pct", REG_BATTERY_SOH_U16, U16, SCALE_PERCENT, 2),
+    )),
+    # 31106-31107 (backup port energy) is not decoded
+    RegisterGroup("energy_totals", TIER_SLOW, (
+        FieldSpec("total_grid_export_kwh", REG_TOTAL_GRID_EXPORT_U32, U32, SCALE_ENERGY_10, 1),
+        FieldSpec("total_grid_import_kwh", REG_TOTAL_GRID_IMPORT_U32, U32, SCALE_ENERGY_10, 1),
+        FieldSpec("total_battery_charge_kwh", REG_TOTAL_BATTERY_CHARGE_U32, U32, SCALE_ENERGY_10, 1),
+        FieldSpec("total_battery_discharge_kwh", REG_TOTAL_BATTERY_DISCHARGE_U32, U32, SCALE_ENERGY_10, 1),
+        FieldSpec("total_pv_energy_kwh", REG_TOTAL_PV_GENERATION_U32, U32, SCALE_ENERGY_10, 1),
+        FieldSpec("total_load_kwh", REG_TOTAL_LOAD_U32, U32, SCALE_ENERGY_10, 1),
+    )),
+    # 31002 (backup port) is not decoded
+    RegisterGroup("daily_energy", TIER_SLOW, (
+        FieldSpec("daily_grid_export_kwh", REG_DAILY_GRID_EXPORT_U16, U16, SCALE_ENERGY_10, 1),
+        FieldSpec("daily_grid_import_kwh", REG_DAILY_GRID_IMPORT_U16, U16, SCALE_ENERGY_10, 1),
+        FieldSpec("daily_battery_charge_kwh", REG_DAILY_BATTERY_CHARGE_U16, U16, SCALE_ENERGY_10, 1),
+        FieldSpec("daily_battery_discharge_kwh", REG_DAILY_BATTERY_DISCHARGE_U16, U16, SCALE_ENERGY_10, 1),
+        FieldSpec("daily_pv_energy_kwh", REG_DAILY_PV_GENERATION_U16, U16, SCALE_ENERGY_10, 1),
+        FieldSpec("daily_load_kwh", REG_DAILY_LOAD_U16, U16, SCALE_ENERGY_10, 1),
+    )),
+)
+
+
+# Group each decoded key belongs to
+KEY_GROUPS: dict[str, RegisterGroup] = {key: g for g in REGISTER_GROUPS for key in g.keys}
+
+
+@lru_cache(maxsize=32)
+def compile_groups(
+    groups: tuple[RegisterGroup, ...], max_gap: int
+) -> tuple[tuple[ReadBlock, BlockDecoder], ...]:
+    """Plan the block reads for `groups` and compile a decoder per block."""
+    fields = [f for group in groups for f in group.fields]
+    plan = []
+    for block in plan_reads((f.span for f in fields), max_gap=max_gap):
+        in_block = tuple(f for f in fields if block.covers(f.address, f.count))
+        plan.append((block, compile_block(block, in_block)))
+    return tuple(plan)
+
+
+# Writable settings, encoded like the decoded fields above
+CONTROLS: dict[str, FieldSpec] = {
+    f.key: f
+    for f in (
+        FieldSpec("battery_power_setpoint_w", REG_BATTERY_POWER_SET_I32, I32),
+        FieldSpec("grid_injection_limit_enabled", REG_GRID_INJECTION_LIMIT_SWITCH_U16, U16),
+        FieldSpec("grid_injection_limit_pct", REG_GRID_INJECTION_LIMIT_U16, U16, 0.1),
+        FieldSpec("working_mode", REG_WORKING_MODE_U16, U16),
+    )
+}
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import struct
+from functools import lru_cache
+
+# Largest RTU frame: unit + func + bytecount + 250 data bytes + CRC.
+MAX_FRAME_LEN = 256
+
+FUNC_READ_HOLDING = 0x03
+FUNC_READ_INPUT = 0x04
+FUNC_WRITE_SINGLE = 0x06
+FUNC_WRITE_MULTIPLE = 0x10
+
+# Function 0x10 carries at most 123 registers in one frame
+MAX_WRITE_REGISTERS = 123
+
+
+class FrameError(IOError):
+    """A response frame was truncated, garbled or did not match the request."""
+
+
+class CrcError(FrameError):
+    """A response frame failed CRC validation."""
+
+
+class ModbusExceptionError(IOError):
+    """The device answered with a Modbus exception response."""
+
+    def __init__(self, code: int) -> None:
+        super().__init__(f"Modbus exception {code:#02x}")
+        self.code = code
+
+
+def _make_crc_table() -> tuple[int, ...]:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if (crc & 1) else (crc >> 1)
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC_TABLE = _make_crc_table()
+
+
+def crc16_modbus(data: bytes | bytearray | memoryview) -> int:
+    """CRC16/MODBUS using a precomputed table (one lookup per byte)."""
+    crc = 0xFFFF
+    table = _CRC_TABLE
+    for b in data:
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+    return crc
+
+
+def check_crc(frame: bytes | bytearray | memoryview) -> bool:
+    """Validate a complete frame; the CRC over data plus CRC bytes is zero."""
+    return len(frame) >= 4 and crc16_modbus(frame) == 0
+
+
+@lru_cache(maxsize=128)
+def build_read_request(unit: int, func: int, address: int, count: int) -> bytes:
+    """Build a read request frame.
+
+    Poll cycles send the same handful of requests over and over, so the
+    encoded frames (CRC included) are cached instead of recomputed.
+    """
+    # [unit][func][addrHi addrLo][countHi countLo][crcLo crcHi]
+    pdu = struct.pack(">B B H H", unit, func, address, count)
+    return pdu + struct.pack("<H", crc16_modbus(pdu))
+
+
+def build_write_request(unit: int, address: int, values: tuple[int, ...]) -> bytes:
+    """Build a write frame: 0x06 for a single register, 0x10 for several."""
+    if len(values) == 1:
+        # [unit][0x06][addrHi addrLo][valueHi valueLo][crc]
+        pdu = struct.pack(">B B H H", unit, FUNC_WRITE_SINGLE, address, values[0])
+    else:
+        if not 1 <= len(values) <= MAX_WRITE_REGISTERS:
+            raise ValueError(f"Cannot write {len(values)} registers in one request")
+        # [unit][0x10][addrHi addrLo][countHi countLo][bytecount][values...][crc]
+        pdu = struct.pack(
+            f">B B H H B {len(values)}H", unit, FUNC_WRITE_MULTIPLE, address, len(values), 2 * len(values), *values
+        )
+    return pdu + struct.pack("<H", crc16_modbus(pdu))
+
+
+def expected_length(header: bytes | bytearray | memoryview) -> int:
+    """Total frame length implied by the first three bytes of a response."""
+    func = header[1]
+    if func & 0x80:
+        # [unit][func|0x80][exception code][crc]
+        return 5
+    if func in (FUNC_READ_HOLDING, FUNC_READ_INPUT):
+        # [unit][func][bytecount][data...][crc]
+        length = 3 + header[2] + 2
+        if length > MAX_FRAME_LEN:
+            raise FrameError(f"Byte count {header[2]} exceeds the Modbus limit")
+        return length
+    if func in (FUNC_WRITE_SINGLE, FUNC_WRITE_MULTIPLE):
+        # [unit][func][addrHi addrLo][value or count][crc]
+        return 8
+    raise FrameError(f"Unsupported function code {func:#02x} in response")
+
+
+def parse_read_response(frame: memoryview, unit: int, func: int, count: int) -> memoryview:
+    """Validate a read response and return a view of its register data."""
+    if not check_crc(frame):
+        raise CrcError(f"CRC mismatch in {len(frame)}-byte response")
+    if frame[0] != unit:
+        raise FrameError(f"Unit mismatch: got {frame[0]} expected {unit}")
+    if frame[1] & 0x80:
+        raise ModbusExceptionError(frame[2])
+    if frame[1] != func:
+        raise FrameError(f"Function mismatch: got {frame[1]} expected {func}")
+    if frame[2] != count * 2:
+        raise FrameError(f"Byte count mismatch: got {frame[2]} expected {count * 2}")
+    return frame[3:3 + frame[2]]
+
+
+def parse_write_response(frame: memoryview, request: bytes) -> None:
+    """Validate the echo a device sends back for a write request."""
+    if not check_crc(frame):
+        raise CrcError(f"CRC mismatch in {len(frame)}-byte response")
+    if frame[0] != request[0]:
+        raise FrameError(f"Unit mismatch: got {frame[0]} expected {request[0]}")
+    if frame[1] & 0x80:
+        raise ModbusExceptionError(frame[2])
+    # 0x06 echoes address and value, 0x10 address and count
+    if frame[1:6] != request[1:6]:
+        raise FrameError("Write response does not match the request")
+
+
+class RtuFrameProtocol(asyncio.BufferedProtocol):
+    """Receive RTU response frames straight into one reusable buffer.
+
+    The event loop writes incoming bytes directly into the buffer, and the
+    frame is complete once the length announced by its header has arrived.
+    `request` returns a memoryview into the buffer which is only valid until
+    the next request, so callers must decode it before sending again.
+    """
+
+    def __init__(self) -> None:
+        self._buf = bytearray(MAX_FRAME_LEN)
+        self._view = memoryview(self._buf)
+        self._scratch = memoryview(bytearray(MAX_FRAME_LEN))
+        self._discarding = True
+        self._fill = 0
+        self._expected = 0
+        self._waiter: asyncio.Future[memoryview] | None = None
+        self.transport: asyncio.Transport | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.transport = None
+        self._fail(exc or ConnectionResetError("Connection closed by peer"))
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        self._discarding = self._waiter is None or self._waiter.done()
+        if self._discarding:
+            # Late or unsolicited bytes must not clobber a frame the caller
+            # has not decoded yet.
+            return self._scratch
+        return self._view[self._fill:]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        if self._discarding:
+            return
+        self._fill += nbytes
+        if not self._expected and self._fill >= 3:
+            try:
+                self._expected = expected_length(self._view[:3])
+            except FrameError as err:
+                self._fail(err)
+                return
+        if self._expected and self._fill >= self._expected:
+            self._waiter.set_result(self._view[:self._expected])
+
+    def eof_received(self) -> bool:
+        return False
+
+    def _fail(self, exc: BaseException) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_exception(exc)
+
+    async def request(self, frame: bytes, timeout: float) -> memoryview:
+        if self.transport is None or self.transport.is_closing():
+            raise ConnectionResetError("Not connected")
+        self._fill = 0
+        self._expected = 0
+        self._waiter = asyncio.get_running_loop().create_future()
+        self.transport.write(frame)
+        try:
+            return await asyncio.wait_for(self._waiter, timeout)
+        except asyncio.TimeoutError:
+            if self._fill:
+                raise FrameError(
+                    f"Truncated response: {self._fill} of {self._expected or '?'} bytes"
+                ) from None
+            raise
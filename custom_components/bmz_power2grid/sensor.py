@@ -1,15 +1,30 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Callable
 
 from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 
-from .const import DOMAIN
+from .const import DOMAIN, STATS_KEYS, STATS_WINDOWS
 from .coordinator import BmzCoordinator
 
+# Write unchanged states at least this often (seconds) so the recorder and
+# history graphs still see the sensor alive.
+MAX_SILENCE = 300
+
+# Deadbands for the sensor definitions below
+_W = 10.0      # W
+_V = 0.5       # V
+_HZ = 0.02     # Hz
+_C = 0.5       # °C
+_A_PCT = 0.02  # 2 % of the last published current
+_PCT = 0.5     # percentage points
+_KWH = 0.01    # kWh
+
 
 @dataclass(frozen=True)
 class BmzSensorDef:
@@ -19,46 +34,59 @@ class BmzSensorDef:
     device_class: SensorDeviceClass | None
     state_class: SensorStateClass | None
     icon: str | None = None
+    # Changes smaller than max(deadband, deadband_pct * |last value|) are
+    # not written to the state machine
+    deadband: float = 0
+    deadband_pct: float = 0
+    precision: int | None = None
+    # Rarely used sensors start disabled; their registers are only polled
+    # once enabled
+    enabled: bool = True
 
 
 SENSORS: tuple[BmzSensorDef, ...] = (
     # === POWER (instantaneous) ===
     # Spec: "Total PV Input Power" (reg 11028)
-    BmzSensorDef("pv_power_w", "Solar Power", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+    BmzSensorDef("pv_power_w", "Solar Power", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, deadband=_W),
     # Spec: "Battery_P" (reg 30258) - positive=discharge, negative=charge
-    BmzSensorDef("battery_power_w", "Battery Power", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("battery_charge_w", "Battery Charging", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("battery_discharge_w", "Battery Discharging", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+    BmzSensorDef("battery_power_w", "Battery Power", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, deadband=_W),
+    BmzSensorDef("battery_charge_w", "Battery Charging", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, deadband=_W),
+    BmzSensorDef("battery_discharge_w", "Battery Discharging", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, deadband=_W),
     # Spec: "Pmeter" (reg 10994-11001) - positive=export, negative=import
-    BmzSensorDef("grid_power_total_w", "Grid Power", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("grid_l1_w", "Grid Power L1", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("grid_l2_w", "Grid Power L2", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("grid_l3_w", "Grid Power L3", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("grid_import_w", "Grid Import", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("grid_export_w", "Grid Export", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT),
+    BmzSensorDef("grid_power_total_w", "Grid Power", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, deadband=_W),
+    BmzSensorDef("grid_l1_w", "Grid Power L1", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, deadband=_W),
+    BmzSensorDef("grid_l2_w", "Grid Power L2", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, deadband=_W),
+    BmzSensorDef("grid_l3_w", "Grid Power L3", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, deadband=_W),
+    BmzSensorDef("grid_import_w", "Grid Import", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, deadband=_W),
+    BmzSensorDef("grid_export_w", "Grid Export", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, deadband=_W),
+
+    # Computed from PV, battery and grid power each cycle
+    BmzSensorDef("house_load_w", "House Load", "W", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, "mdi:home-lightning-bolt", deadband=_W),
+    BmzSensorDef("self_consumption_pct", "Self-Consumption", "%", None, SensorStateClass.MEASUREMENT, "mdi:solar-power", deadband=_PCT),
+    BmzSensorDef("autarky_pct", "Autarky", "%", None, SensorStateClass.MEASUREMENT, "mdi:home-battery", deadband=_PCT),
 
     # === BATTERY STATE ===
     # Spec: "SOC" (reg 33000), "SOH" (reg 33001)
     BmzSensorDef("battery_soc_pct", "Battery Level", "%", SensorDeviceClass.BATTERY, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("battery_soh_pct", "Battery Health", "%", None, SensorStateClass.MEASUREMENT),
+    BmzSensorDef("battery_soh_pct", "Battery Health", "%", None, SensorStateClass.MEASUREMENT, enabled=False),
     # Spec: "Battery_V" (reg 30254), "Battery_I" (reg 30255)
-    BmzSensorDef("battery_voltage", "Battery Voltage", "V", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("battery_current", "Battery Current", "A", SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
+    BmzSensorDef("battery_voltage", "Battery Voltage", "V", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, deadband=_V, enabled=False),
+    BmzSensorDef("battery_current", "Battery Current", "A", SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT, deadband_pct=_A_PCT, enabled=False),
 
     # === GRID V/A/Hz ===
     # Spec: registers 11009-11015
-    BmzSensorDef("grid_l1_v", "Grid Voltage L1", "V", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("grid_l1_a", "Grid Current L1", "A", SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("grid_l2_v", "Grid Voltage L2", "V", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("grid_l2_a", "Grid Current L2", "A", SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("grid_l3_v", "Grid Voltage L3", "V", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("grid_l3_a", "Grid Current L3", "A", SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("grid_frequency", "Grid Frequency", "Hz", SensorDeviceClass.FREQUENCY, SensorStateClass.MEASUREMENT),
+    BmzSensorDef("grid_l1_v", "Grid Voltage L1", "V", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, deadband=_V),
+    BmzSensorDef("grid_l1_a", "Grid Current L1", "A", SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT, deadband_pct=_A_PCT, enabled=False),
+    BmzSensorDef("grid_l2_v", "Grid Voltage L2", "V", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, deadband=_V),
+    BmzSensorDef("grid_l2_a", "Grid Current L2", "A", SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT, deadband_pct=_A_PCT, enabled=False),
+    BmzSensorDef("grid_l3_v", "Grid Voltage L3", "V", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, deadband=_V),
+    BmzSensorDef("grid_l3_a", "Grid Current L3", "A", SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT, deadband_pct=_A_PCT, enabled=False),
+    BmzSensorDef("grid_frequency", "Grid Frequency", "Hz", SensorDeviceClass.FREQUENCY, SensorStateClass.MEASUREMENT, deadband=_HZ),
 
     # === TEMPERATURES ===
     # Spec: "Inverter inner temp" (reg 11032), "Pack temperature" (reg 33003)
-    BmzSensorDef("inverter_temp_c", "Inverter Temperature", "°C", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT),
-    BmzSensorDef("battery_temp_c", "Battery Temperature", "°C", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT),
+    BmzSensorDef("inverter_temp_c", "Inverter Temperature", "°C", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, deadband=_C),
+    BmzSensorDef("battery_temp_c", "Battery Temperature", "°C", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, deadband=_C),
 
     # === ENERGY TOTALS (lifetime) ===
     # Spec: registers 31102-31115
@@ -71,24 +99,115 @@ SENSORS: tuple[BmzSensorDef, ...] = (
 
     # === DAILY ENERGY (resets at midnight) ===
     # Spec: registers 31000-31006
-    BmzSensorDef("daily_pv_energy_kwh", "Today Solar Energy", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-    BmzSensorDef("daily_battery_charge_kwh", "Today Battery Charged", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-    BmzSensorDef("daily_battery_discharge_kwh", "Today Battery Discharged", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-    BmzSensorDef("daily_grid_import_kwh", "Today Grid Import", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-    BmzSensorDef("daily_grid_export_kwh", "Today Grid Export", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
-    BmzSensorDef("daily_load_kwh", "Today Consumption", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING),
+    BmzSensorDef("daily_pv_energy_kwh", "Today Solar Energy", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, enabled=False),
+    BmzSensorDef("daily_battery_charge_kwh", "Today Battery Charged", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, enabled=False),
+    BmzSensorDef("daily_battery_discharge_kwh", "Today Battery Discharged", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, enabled=False),
+    BmzSensorDef("daily_grid_import_kwh", "Today Grid Import", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, enabled=False),
+    BmzSensorDef("daily_grid_export_kwh", "Today Grid Export", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, enabled=False),
+    BmzSensorDef("daily_load_kwh", "Today Consumption", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, enabled=False),
+
+    # Daily counters above, refined between their 0.1 kWh steps by
+    # integrating the matching power
+    BmzSensorDef("daily_pv_energy_precise_kwh", "Today Solar Energy (Precise)", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, deadband=_KWH, precision=2),
+    BmzSensorDef("daily_battery_charge_precise_kwh", "Today Battery Charged (Precise)", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, deadband=_KWH, precision=2),
+    BmzSensorDef("daily_battery_discharge_precise_kwh", "Today Battery Discharged (Precise)", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, deadband=_KWH, precision=2),
+    BmzSensorDef("daily_grid_import_precise_kwh", "Today Grid Import (Precise)", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, deadband=_KWH, precision=2),
+    BmzSensorDef("daily_grid_export_precise_kwh", "Today Grid Export (Precise)", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, deadband=_KWH, precision=2),
+    BmzSensorDef("daily_load_precise_kwh", "Today Consumption (Precise)", "kWh", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, deadband=_KWH, precision=2),
+)
+
+
+@dataclass(frozen=True)
+class BmzDiagnosticDef:
+    key: str
+    name: str
+    unit: str | None
+    device_class: SensorDeviceClass | None
+    value: Callable[[BmzCoordinator], Any]
+
+
+# Polling health; disabled by default
+DIAGNOSTIC_SENSORS: tuple[BmzDiagnosticDef, ...] = (
+    BmzDiagnosticDef(
+        "poll_cycle_p50_ms", "Poll Cycle Latency p50", "ms", SensorDeviceClass.DURATION,
+        lambda c: c.metrics.recent_percentile_ms(0.5),
+    ),
+    BmzDiagnosticDef(
+        "poll_cycle_p95_ms", "Poll Cycle Latency p95", "ms", SensorDeviceClass.DURATION,
+        lambda c: c.metrics.recent_percentile_ms(0.95),
+    ),
+    BmzDiagnosticDef(
+        "poll_error_rate_pct", "Poll Error Rate", "%", None,
+        lambda c: c.client.metrics.error_rate,
+    ),
+    BmzDiagnosticDef(
+        "poll_overrun_rate_pct", "Poll Overrun Rate", "%", None,
+        lambda c: c.metrics.overrun_rate,
+    ),
 )
 
 
+@dataclass(frozen=True)
+class BmzStatisticDef(BmzSensorDef):
+    # Sensor key the statistics are taken from, and the window in seconds
+    source: str = ""
+    window: int = 0
+
+
+# Rolling average of the main power readings, with min/max/median/p95 as
+# attributes; kept in memory, disabled by default
+STATISTIC_SENSORS: tuple[BmzStatisticDef, ...] = tuple(
+    BmzStatisticDef(
+        f"{d.key}_mean_{window // 60}m", f"{d.name} {window // 60} min Average", d.unit,
+        d.device_class, d.state_class, deadband=d.deadband, source=d.key, window=window,
+    )
+    for d in SENSORS
+    if d.key in STATS_KEYS
+    for window in STATS_WINDOWS
+)
+
+
+def _device_info(entry) -> DeviceInfo:
+    return DeviceInfo(
+        identifiers={(DOMAIN, entry.entry_id)},
+        name="BMZ Power2Grid Inverter",
+        manufacturer="BMZ / Solinteg",
+        model="Power2Grid / Hyperion",
+    )
+
+
 async def async_setup_entry(hass, entry, async_add_entities):
     coordinator: BmzCoordinator = hass.data[DOMAIN][entry.entry_id]
-    async_add_entities([BmzSensor(coordinator, entry, s) for s in SENSORS])
+    # Registers the device does not implement get no entity
+    entities: list[SensorEntity] = [
+        BmzSensor(coordinator, entry, s, unit)
+        for unit in coordinator.unit_ids
+        for s in SENSORS
+        if coordinator.supports(unit, s.key)
+    ]
+    entities.extend(
+        BmzStatisticSensor(coordinator, entry, s, unit)
+        for unit in coordinator.unit_ids
+        for s in STATISTIC_SENSORS
+        if coordinator.supports(unit, s.source)
+    )
+    # Only the registers behind enabled sensors are polled
+    coordinator.async_set_entity_keys({
+        entity.unique_id: (entity.unit, entity.source_key, entity.entity_registry_enabled_default)
+        for entity in entities
+        if isinstance(entity, BmzSensor)
+    })
+    entities.extend(BmzDiagnosticSensor(coordinator, entry, d) for d in DIAGNOSTIC_SENSORS)
+    async_add_entities(entities)
 
 
 class BmzSensor(CoordinatorEntity[BmzCoordinator], SensorEntity):
-    def __init__(self, coordinator: BmzCoordinator, entry, definition: BmzSensorDef) -> None:
+    def __init__(self, coordinator: BmzCoordinator, entry, definition: BmzSensorDef, unit: int) -> None:
         super().__init__(coordinator)
         self._def = definition
+        self._unit = unit
+        # Key whose freshness decides availability
+        self._fresh_key = definition.key
 
         self._attr_name = definition.name
         self._attr_unique_id = f"{entry.entry_id}_{definition.key}"
@@ -96,20 +215,151 @@ class BmzSensor(CoordinatorEntity[BmzCoordinator], SensorEntity):
         self._attr_device_class = definition.device_class
         self._attr_state_class = definition.state_class
         self._attr_icon = definition.icon
+        if not definition.enabled:
+            self._attr_entity_registry_enabled_default = False
 
         # Energy Dashboard wants higher precision for energy sensors
-        if definition.device_class == SensorDeviceClass.ENERGY:
+        if definition.precision is not None:
+            self._attr_suggested_display_precision = definition.precision
+        elif definition.device_class == SensorDeviceClass.ENERGY:
             self._attr_suggested_display_precision = 1
 
-        self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, entry.entry_id)},
-            name="BMZ Power2Grid Inverter",
-            manufacturer="BMZ / Solinteg",
-            model="Power2Grid / Hyperion",
-        )
+        self._attr_device_info = _device_info(entry)
+
+        # Further units on the same gateway get their own device
+        if unit != coordinator.unit_id:
+            self._attr_unique_id = f"{entry.entry_id}_{unit}_{definition.key}"
+            self._attr_device_info = DeviceInfo(
+                identifiers={(DOMAIN, f"{entry.entry_id}_{unit}")},
+                name=f"BMZ Power2Grid Unit {unit}",
+                manufacturer="BMZ / Solinteg",
+                model="Power2Grid / Hyperion",
+                via_device=(DOMAIN, entry.entry_id),
+            )
+
+        # Last value and availability written to the state machine
+        self._published: Any = self._current_value()
+        self._published_available: bool | None = None
+        self._published_stale: bool | None = None
+        self._published_at = 0.0
+
+    @property
+    def unit(self) -> int:
+        return self._unit
+
+    @property
+    def source_key(self) -> str:
+        """Key whose registers this sensor shows."""
+        return self._fresh_key
+
+    @property
+    def available(self) -> bool:
+        # A failed block only takes down its own sensors, and only once its
+        # last value is too old
+        return super().available and self.coordinator.is_fresh(self._unit, self._fresh_key)
+
+    def _current_value(self) -> Any:
+        data = self.coordinator.values_for(self._unit)
+        if data is None:
+            return None
+        return data.get(self._def.key)
+
+    def _significant(self, value: Any) -> bool:
+        """Whether `value` differs enough from the published one to write it."""
+        old = self._published
+        if value == old:
+            return False
+        if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+            return True
+        if value == 0 or old == 0:
+            # Always report switching on/off, e.g. the battery stops charging
+            return True
+        threshold = max(self._def.deadband, self._def.deadband_pct * abs(old))
+        return abs(value - old) >= threshold
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only on real changes, plus a periodic heartbeat."""
+        value = self._current_value()
+        now = time.monotonic()
+        if (
+            self.available == self._published_available
+            and self._stale() == self._published_stale
+            and not self._significant(value)
+            and now - self._published_at < MAX_SILENCE
+        ):
+            return
+        self._published = value
+        self.async_write_ha_state()
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        # Track every write, including the initial one when the entity is added
+        self._published_available = self.available
+        self._published_stale = self._stale()
+        self._published_at = time.monotonic()
+        super().async_write_ha_state()
+
+    def _stale(self) -> bool:
+        return self.coordinator.is_stale(self._unit, self._fresh_key)
 
     @property
     def native_value(self) -> Any:
-        if self.coordinator.data is None:
+        return self._published
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        # Restored from the last run and not yet confirmed by the device
+        return {"stale": True} if self._published_stale else None
+
+
+class BmzStatisticSensor(BmzSensor):
+    _attr_entity_registry_enabled_default = False
+    # Derived from the source sensor; keep the attributes out of the recorder
+    _unrecorded_attributes = frozenset({"min", "max", "median", "p95", "samples"})
+
+    _def: BmzStatisticDef
+
+    def __init__(self, coordinator: BmzCoordinator, entry, definition: BmzStatisticDef, unit: int) -> None:
+        super().__init__(coordinator, entry, definition, unit)
+        self._fresh_key = definition.source
+
+    def _current_value(self) -> Any:
+        # Running mean only; this runs on every coordinator update
+        stats = self.coordinator.statistics(self._unit, self._def.source, self._def.window)
+        if stats is None:
+            return None
+        return round(stats["mean"], 1)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        # Sorting for the percentiles only happens when a state is written
+        stats = self.coordinator.statistics(self._unit, self._def.source, self._def.window, percentiles=True)
+        if stats is None:
             return None
-        return self.coordinator.data.get(self._def.key)
+        return {key: stats[key] for key in ("min", "max", "median", "p95", "samples")}
+
+
+class BmzDiagnosticSensor(CoordinatorEntity[BmzCoordinator], SensorEntity):
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, coordinator: BmzCoordinator, entry, definition: BmzDiagnosticDef) -> None:
+        super().__init__(coordinator)
+        self._def = definition
+
+        self._attr_name = definition.name
+        self._attr_unique_id = f"{entry.entry_id}_{definition.key}"
+        self._attr_native_unit_of_measurement = definition.unit
+        self._attr_device_class = definition.device_class
+        self._attr_device_info = _device_info(entry)
+
+    @property
+    def available(self) -> bool:
+        # Most useful exactly when polling fails
+        return True
+
+    @property
+    def native_value(self) -> Any:
+        return self._def.value(self.coordinator)
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import struct
+from functools import partial
+from typing import Awaitable
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+
+from .const import DOMAIN, CONF_UNIT_ID, DEFAULT_READ_MAX_AGE, MAX_READ_REGISTERS, WORKING_MODES
+from .coordinator import BmzCoordinator
+from .registers import CONTROLS
+from .rtu_codec import MAX_WRITE_REGISTERS, ModbusExceptionError
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_POWER = "power"
+ATTR_LIMIT = "limit"
+ATTR_ENABLED = "enabled"
+ATTR_MODE = "mode"
+ATTR_ADDRESS = "address"
+ATTR_VALUES = "values"
+ATTR_COUNT = "count"
+ATTR_MAX_AGE = "max_age"
+
+SERVICE_DISCOVER_REGISTERS = "discover_registers"
+SERVICE_SET_BATTERY_POWER = "set_battery_power"
+SERVICE_SET_EXPORT_LIMIT = "set_export_limit"
+SERVICE_SET_WORKING_MODE = "set_working_mode"
+SERVICE_WRITE_REGISTERS = "write_registers"
+SERVICE_READ_REGISTERS = "read_registers"
+
+DISCOVER_REGISTERS_SCHEMA = vol.Schema({vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string})
+
+_TARGET = {
+    vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Optional(CONF_UNIT_ID): vol.All(vol.Coerce(int), vol.Range(min=0, max=255)),
+}
+SET_BATTERY_POWER_SCHEMA = vol.Schema(
+    {**_TARGET, vol.Required(ATTR_POWER): vol.All(vol.Coerce(int), vol.Range(min=-100000, max=100000))}
+)
+SET_EXPORT_LIMIT_SCHEMA = vol.Schema(
+    {
+        **_TARGET,
+        vol.Required(ATTR_LIMIT): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+        vol.Optional(ATTR_ENABLED, default=True): cv.boolean,
+    }
+)
+SET_WORKING_MODE_SCHEMA = vol.Schema({**_TARGET, vol.Required(ATTR_MODE): vol.In(list(WORKING_MODES))})
+WRITE_REGISTERS_SCHEMA = vol.Schema(
+    {
+        **_TARGET,
+        vol.Required(ATTR_ADDRESS): vol.All(vol.Coerce(int), vol.Range(min=0, max=0xFFFF)),
+        vol.Required(ATTR_VALUES): vol.All(
+            cv.ensure_list,
+            vol.Length(min=1, max=MAX_WRITE_REGISTERS),
+            [vol.All(vol.Coerce(int), vol.Range(min=0, max=0xFFFF))],
+        ),
+    }
+)
+
+
+def _within_register_space(data: dict) -> dict:
+    if data[ATTR_ADDRESS] + data[ATTR_COUNT] > 0x10000:
+        raise vol.Invalid("Range runs past register 65535")
+    return data
+
+
+READ_REGISTERS_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            **_TARGET,
+            vol.Required(ATTR_ADDRESS): vol.All(vol.Coerce(int), vol.Range(min=0, max=0xFFFF)),
+            vol.Optional(ATTR_COUNT, default=1): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_READ_REGISTERS)),
+            vol.Optional(ATTR_MAX_AGE, default=DEFAULT_READ_MAX_AGE): vol.All(
+                vol.Coerce(float), vol.Range(min=0)
+            ),
+        }
+    ),
+    _within_register_space,
+)
+
+
+def _coordinators(hass: HomeAssistant, call: ServiceCall) -> dict[str, BmzCoordinator]:
+    """Coordinators addressed by a call: the given entry, or all of them."""
+    # hass.data[DOMAIN] also holds the shared gateway clients
+    coordinators = {
+        entry_id: value
+        for entry_id, value in hass.data.get(DOMAIN, {}).items()
+        if isinstance(value, BmzCoordinator)
+    }
+    entry_id = call.data.get(ATTR_CONFIG_ENTRY_ID)
+    if entry_id is None:
+        return dict(coordinators)
+    if entry_id not in coordinators:
+        raise HomeAssistantError(f"No loaded BMZ Power2Grid entry {entry_id}")
+    return {entry_id: coordinators[entry_id]}
+
+
+def _target(hass: HomeAssistant, call: ServiceCall) -> tuple[BmzCoordinator, int]:
+    """The coordinator and unit ID a write goes to."""
+    coordinators = _coordinators(hass, call)
+    if len(coordinators) != 1:
+        raise HomeAssistantError("Several BMZ Power2Grid entries are loaded; select one")
+    coordinator = next(iter(coordinators.values()))
+    unit = call.data.get(CONF_UNIT_ID, coordinator.unit_id)
+    if unit not in coordinator.unit_ids:
+        raise HomeAssistantError(f"Unit {unit} is not polled by this entry")
+    return coordinator, unit
+
+
+async def _async_discover_registers(hass: HomeAssistant, call: ServiceCall) -> None:
+    for entry_id, coordinator in _coordinators(hass, call).items():
+        previous = dict(coordinator.profiles)
+        if not await coordinator.async_discover():
+            raise HomeAssistantError(f"Register discovery for {coordinator.host} failed, see the log")
+        if coordinator.profiles != previous:
+            # The set of sensors follows the profile
+            await hass.config_entries.async_reload(entry_id)
+
+
+async def _async_checked_write(unit: int, address: int, write: Awaitable[None]) -> None:
+    """Await a write, turning device, connection and value errors into service errors."""
+    try:
+        await write
+    except ModbusExceptionError as err:
+        raise HomeAssistantError(f"Unit {unit} rejected writing register {address}: {err}") from err
+    except IOError as err:
+        raise HomeAssistantError(f"Writing register {address} failed: {err}") from err
+    except ValueError as err:
+        raise HomeAssistantError(f"Cannot write register {address}: {err}") from err
+
+
+async def _async_write_control(coordinator: BmzCoordinator, unit: int, key: str, value: float) -> None:
+    control = CONTROLS[key]
+    await _async_checked_write(unit, control.address, coordinator.async_write(unit, control, value))
+
+
+async def _async_set_battery_power(hass: HomeAssistant, call: ServiceCall) -> None:
+    coordinator, unit = _target(hass, call)
+    await _async_write_control(coordinator, unit, "battery_power_setpoint_w", call.data[ATTR_POWER])
+
+
+async def _async_set_export_limit(hass: HomeAssistant, call: ServiceCall) -> None:
+    coordinator, unit = _target(hass, call)
+    await _async_write_control(coordinator, unit, "grid_injection_limit_pct", call.data[ATTR_LIMIT])
+    await _async_write_control(coordinator, unit, "grid_injection_limit_enabled", int(call.data[ATTR_ENABLED]))
+
+
+async def _async_set_working_mode(hass: HomeAssistant, call: ServiceCall) -> None:
+    coordinator, unit = _target(hass, call)
+    await _async_write_control(coordinator, unit, "working_mode", WORKING_MODES[call.data[ATTR_MODE]])
+
+
+async def _async_write_registers(hass: HomeAssistant, call: ServiceCall) -> None:
+    coordinator, unit = _target(hass, call)
+    address = call.data[ATTR_ADDRESS]
+    await _async_checked_write(
+        unit, address, coordinator.async_write_registers(unit, address, tuple(call.data[ATTR_VALUES]))
+    )
+
+
+async def _async_read_registers(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    coordinator, unit = _target(hass, call)
+    address, count = call.data[ATTR_ADDRESS], call.data[ATTR_COUNT]
+    try:
+        raw = await coordinator.async_read_registers(unit, address, count, call.data[ATTR_MAX_AGE])
+    except ModbusExceptionError as err:
+        raise HomeAssistantError(f"Unit {unit} rejected reading registers {address}-{address + count - 1}: {err}") from err
+    except IOError as err:
+        raise HomeAssistantError(f"Reading registers {address}-{address + count - 1} failed: {err}") from err
+    return {ATTR_ADDRESS: address, ATTR_VALUES: list(struct.unpack(f">{count}H", raw))}
+
+
+_SERVICES = {
+    SERVICE_DISCOVER_REGISTERS: (_async_discover_registers, DISCOVER_REGISTERS_SCHEMA, SupportsResponse.NONE),
+    SERVICE_SET_BATTERY_POWER: (_async_set_battery_power, SET_BATTERY_POWER_SCHEMA, SupportsResponse.NONE),
+    SERVICE_SET_EXPORT_LIMIT: (_async_set_export_limit, SET_EXPORT_LIMIT_SCHEMA, SupportsResponse.NONE),
+    SERVICE_SET_WORKING_MODE: (_async_set_working_mode, SET_WORKING_MODE_SCHEMA, SupportsResponse.NONE),
+    SERVICE_WRITE_REGISTERS: (_async_write_registers, WRITE_REGISTERS_SCHEMA, SupportsResponse.NONE),
+    SERVICE_READ_REGISTERS: (_async_read_registers, READ_REGISTERS_SCHEMA, SupportsResponse.ONLY),
+}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    for name, (handler, schema, supports_response) in _SERVICES.items():
+        hass.services.async_register(
+            DOMAIN, name, partial(handler, hass), schema=schema, supports_response=supports_response
+        )
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from array import array
+from typing import TYPE_CHECKING, Callable
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
+
+from .const import DOMAIN, STREAM_BUFFER_SIZE, STREAM_GROUPS, STREAM_STATE_INTERVAL
+from .registers import REGISTER_GROUPS, compile_groups
+
+if TYPE_CHECKING:
+    from .coordinator import BmzCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Longest pause between samples while the device keeps failing (seconds)
+_MAX_ERROR_BACKOFF = 5.0
+
+
+def stream_signal(entry_id: str) -> str:
+    """Dispatcher signal carrying each new stream sample of an entry."""
+    return f"{DOMAIN}_{entry_id}_stream"
+
+
+@callback
+def async_subscribe_stream(
+    hass: HomeAssistant, entry_id: str, target: Callable[[float, dict[str, float]], None]
+) -> CALLBACK_TYPE:
+    """Call `target(timestamp, values)` for every sample; returns the unsubscribe."""
+    return async_dispatcher_connect(hass, stream_signal(entry_id), target)
+
+
+class SampleRing:
+    """Fixed-size ring buffer of samples, one float array per key."""
+
+    def __init__(self, keys: tuple[str, ...], capacity: int) -> None:
+        self.keys = keys
+        self.capacity = capacity
+        self._times = array("d", [math.nan]) * capacity
+        self._columns = {key: array("d", [math.nan]) * capacity for key in keys}
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, values: dict[str, float]) -> None:
+        i = self._next
+        self._times[i] = timestamp
+        for key, column in self._columns.items():
+            column[i] = values.get(key, math.nan)
+        self._next = (i + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def _order(self) -> range:
+        start = (self._next - self._size) % self.capacity
+        return range(start, start + self._size)
+
+    def times(self) -> list[float]:
+        """Sample timestamps, oldest first."""
+        return [self._times[i % self.capacity] for i in self._order()]
+
+    def values(self, key: str) -> list[float]:
+        """Values of `key`, oldest first."""
+        column = self._columns[key]
+        return [column[i % self.capacity] for i in self._order()]
+
+    def latest(self) -> tuple[float, dict[str, float]] | None:
+        if not self._size:
+            return None
+        i = (self._next - 1) % self.capacity
+        return self._times[i], {key: column[i] for key, column in self._columns.items()}
+
+
+class GridStream:
+    """Read the grid meter and battery power blocks at a sub-second rate.
+
+    Runs next to the coordinator on the same shared client. Every sample is
+    stored in a ring buffer and pushed to dispatcher subscribers right away,
+    while the coordinator's data and entities are only updated every
+    STREAM_STATE_INTERVAL seconds. The coordinator skips the streamed groups
+    as long as the stream keeps them fresh.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator: BmzCoordinator, interval: float) -> None:
+        self.hass = hass
+        self.coordinator = coordinator
+        self.interval = interval
+        self.groups = tuple(g for g in REGISTER_GROUPS if g.name in STREAM_GROUPS)
+        self.buffer = SampleRing(tuple(k for g in self.groups for k in g.keys), STREAM_BUFFER_SIZE)
+        self.signal = stream_signal(coordinator.entry.entry_id)
+        self.samples = 0
+        self.errors = 0
+        self._task: asyncio.Task | None = None
+        self._published_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @callback
+    def async_start(self) -> None:
+        if not self.running:
+            self._task = self.hass.async_create_background_task(
+                self._run(), f"{DOMAIN} grid stream {self.coordinator.entry.entry_id}"
+            )
+
+    async def async_stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        backoff = self.interval
+        while True:
+            try:
+                await self._sample()
+            except IOError as err:
+                self.errors += 1
+                _LOGGER.debug("Stream sample failed: %s", err)
+                backoff = min(backoff * 2, _MAX_ERROR_BACKOFF)
+                next_at = loop.time() + backoff
+            else:
+                backoff = self.interval
+                # Fixed rate; skip ticks rather than bunch up after a slow read
+                next_at = max(next_at + self.interval, loop.time())
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+
+    async def _sample(self) -> None:
+        coordinator = self.coordinator
+        unit = coordinator.unit_id
+        values: dict[str, float] = {}
+        groups = coordinator.profile(unit).groups(self.groups)
+        for block, decoder in compile_groups(groups, coordinator.read_gap(unit)):
+            raw = await coordinator.client.read_holding_registers_raw(unit, block.address, block.count)
+            coordinator.registers.store(unit, block.address, raw, time.monotonic())
+            decoder.decode(raw, values)
+        for group in groups:
+            if group.derive is not None:
+                group.derive(values)
+
+        now = time.monotonic()
+        self.samples += 1
+        self.buffer.append(now, values)
+        async_dispatcher_send(self.hass, self.signal, now, values)
+        coordinator.stream_update(unit, groups, values, now)
+
+        if now - self._published_at >= STREAM_STATE_INTERVAL:
+            self._published_at = now
+            coordinator.async_update_listeners()
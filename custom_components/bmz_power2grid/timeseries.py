@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from array import array
+from collections import deque
+
+
+class _Window:
+    """Running aggregates over the samples of one trailing time window."""
+
+    __slots__ = ("length", "start", "total", "mins", "maxs")
+
+    def __init__(self, length: float) -> None:
+        self.length = length
+        # Sequence number of the oldest sample inside the window
+        self.start = 0
+        self.total = 0.0
+        # Sequence numbers of min/max candidates, values monotonic from the left
+        self.mins: deque[int] = deque()
+        self.maxs: deque[int] = deque()
+
+
+class RollingSeries:
+    """Ring buffer of (time, value) samples with rolling stats per window.
+
+    Appending keeps sum, min and max of every window up to date in amortised
+    O(1), so the buffer can be fed on every poll or stream sample. Percentiles
+    need the window sorted and are computed only when asked for. Once more
+    than `capacity` samples fall into a window, the oldest ones are dropped
+    early and the window covers a shorter span.
+    """
+
+    def __init__(self, windows: tuple[float, ...], capacity: int) -> None:
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        # Number of samples appended so far; sample n is stored at n % capacity
+        self._seq = 0
+        self._windows = {length: _Window(length) for length in windows}
+
+    def __len__(self) -> int:
+        return min(self._seq, self.capacity)
+
+    def append(self, timestamp: float, value: float) -> None:
+        seq = self._seq
+        cap = self.capacity
+        values = self._values
+        for window in self._windows.values():
+            if window.start <= seq - cap:
+                # The slot is about to be overwritten
+                self._evict(window)
+        self._times[seq % cap] = timestamp
+        values[seq % cap] = value
+        self._seq = seq + 1
+        for window in self._windows.values():
+            window.total += value
+            mins = window.mins
+            while mins and values[mins[-1] % cap] >= value:
+                mins.pop()
+            mins.append(seq)
+            maxs = window.maxs
+            while maxs and values[maxs[-1] % cap] <= value:
+                maxs.pop()
+            maxs.append(seq)
+        self.expire(timestamp)
+
+    def _evict(self, window: _Window) -> None:
+        seq = window.start
+        window.total -= self._values[seq % self.capacity]
+        if window.mins and window.mins[0] == seq:
+            window.mins.popleft()
+        if window.maxs and window.maxs[0] == seq:
+            window.maxs.popleft()
+        window.start = seq + 1
+        if window.start == self._seq:
+            # Empty again; drop accumulated rounding error
+            window.total = 0.0
+
+    def expire(self, now: float) -> None:
+        """Drop samples that fell out of their windows by `now`."""
+        times = self._times
+        cap = self.capacity
+        for window in self._windows.values():
+            cutoff = now - window.length
+            while window.start < self._seq and times[window.start % cap] < cutoff:
+                self._evict(window)
+
+    def stats(self, length: float, now: float, percentiles: bool = False) -> dict[str, float] | None:
+        """Aggregates of the window of `length` seconds ending at `now`.
+
+        Mean, min and max come from the running aggregates; median and p95
+        sort the window and are only included with `percentiles`.
+        """
+        self.expire(now)
+        window = self._windows[length]
+        count = self._seq - window.start
+        if not count:
+            return None
+        cap = self.capacity
+        stats = {
+            "mean": window.total / count,
+            "min": self._values[window.mins[0] % cap],
+            "max": self._values[window.maxs[0] % cap],
+            "samples": count,
+        }
+        if percentiles:
+            ordered = sorted(self._values[i % cap] for i in range(window.start, self._seq))
+            stats["median"] = ordered[count // 2]
+            stats["p95"] = ordered[min(count - 1, int(count * 0.95))]
+        return stats
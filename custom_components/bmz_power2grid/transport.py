@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Protocol, Sequence
+
+from homeassistant.core import HomeAssistant
+
+from .capture import FrameRecorder
+from .const import DOMAIN, DEFAULT_TRANSPORT, TRANSPORT_MODBUS_TCP, TRANSPORT_RTU_OVER_TCP
+from .metrics import ClientMetrics
+from .modbus_client import RtuOverTcpClient
+from .modbus_tcp import ModbusTcpClient
+
+# Key in hass.data[DOMAIN] holding the per-gateway shared clients
+DATA_CLIENTS = "clients"
+
+
+class ModbusClient(Protocol):
+    """What the coordinator needs from a gateway client, whatever the framing."""
+
+    host: str
+    port: int
+    idle_timeout: float
+    metrics: ClientMetrics
+    recorder: FrameRecorder | None
+
+    @property
+    def connected(self) -> bool: ...
+
+    async def read_holding_registers_raw(self, unit: int, address: int, count: int) -> bytes: ...
+
+    async def write_registers(self, unit: int, address: int, values: Sequence[int]) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+CLIENT_TYPES: dict[str, type[ModbusClient]] = {
+    TRANSPORT_RTU_OVER_TCP: RtuOverTcpClient,
+    TRANSPORT_MODBUS_TCP: ModbusTcpClient,
+}
+
+
+@dataclass
+class _SharedClient:
+    client: ModbusClient
+    users: set[str] = field(default_factory=set)
+
+
+def acquire_client(
+    hass: HomeAssistant,
+    entry_id: str,
+    host: str,
+    port: int,
+    timeout: float,
+    idle_timeout: float,
+    transport: str = DEFAULT_TRANSPORT,
+) -> ModbusClient:
+    """Return the client for (host, port), shared by all config entries.
+
+    A gateway only takes one request at a time (or a few, with Modbus TCP),
+    so every entry pointing at it must go through the same connection and
+    request queue.
+    """
+    clients: dict[tuple[str, int, str], _SharedClient] = hass.data.setdefault(DOMAIN, {}).setdefault(
+        DATA_CLIENTS, {}
+    )
+    shared = clients.get((host, port, transport))
+    if shared is None:
+        shared = clients[(host, port, transport)] = _SharedClient(
+            CLIENT_TYPES[transport](host=host, port=port, timeout=timeout, idle_timeout=idle_timeout)
+        )
+    else:
+        # Entries may poll at different rates; keep the connection open for
+        # the slowest one.
+        shared.client.idle_timeout = max(shared.client.idle_timeout, idle_timeout)
+    shared.users.add(entry_id)
+    return shared.client
+
+
+async def release_client(
+    hass: HomeAssistant, entry_id: str, host: str, port: int, transport: str = DEFAULT_TRANSPORT
+) -> None:
+    """Drop an entry's claim on a shared client; close it once unused."""
+    clients: dict[tuple[str, int, str], _SharedClient] = hass.data.get(DOMAIN, {}).get(DATA_CLIENTS, {})
+    shared = clients.get((host, port, transport))
+    if shared is None:
+        return
+    shared.users.discard(entry_id)
+    if not shared.users:
+        del clients[(host, port, transport)]
+        await shared.client.close()
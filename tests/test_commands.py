@@ -0,0 +1,108 @@
+"""Tests for the coalescing command queue and its read-back verification."""
+from __future__ import annotations
+
+import asyncio
+import struct
+
+import pytest
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.bmz_power2grid.commands import CommandQueue
+from custom_components.bmz_power2grid.planner import ReadBlock
+
+
+class FakeHass:
+    def async_create_background_task(self, target, name):
+        return asyncio.create_task(target, name=name)
+
+
+class FakeClient:
+    """Stores written registers; each write blocks until released."""
+
+    def __init__(self) -> None:
+        self.registers: dict[tuple[int, int], int] = {}
+        self.writes: list[tuple[int, int, tuple[int, ...]]] = []
+        self.release = asyncio.Event()
+
+    async def write_registers(self, unit: int, address: int, values: tuple[int, ...]) -> None:
+        await self.release.wait()
+        self.writes.append((unit, address, values))
+        for offset, value in enumerate(values):
+            self.registers[(unit, address + offset)] = value
+
+    async def read_block(self, unit: int, block: ReadBlock) -> bytes:
+        words = [self.registers.get((unit, address), 0) for address in range(block.address, block.end)]
+        return struct.pack(f">{block.count}H", *words)
+
+
+def _read_gap(unit: int) -> int:
+    return 16
+
+
+def test_last_write_wins():
+    async def run() -> tuple[FakeClient, CommandQueue]:
+        client = FakeClient()
+        queue = CommandQueue(FakeHass(), client)
+        first = asyncio.create_task(queue.async_write(1, 100, (1,)))
+        await asyncio.sleep(0)
+        # The first write is on the wire; these two queue up behind it
+        writes = [asyncio.create_task(queue.async_write(1, 100, (value,))) for value in (2, 3)]
+        other = asyncio.create_task(queue.async_write(1, 200, (7,)))
+        await asyncio.sleep(0)
+        client.release.set()
+        await asyncio.gather(first, *writes, other)
+        return client, queue
+
+    client, queue = asyncio.run(run())
+    assert client.writes == [(1, 100, (1,)), (1, 100, (3,)), (1, 200, (7,))]
+    assert queue.coalesced == 1
+    assert queue.unverified == {(1, 100): (3,), (1, 200): (7,)}
+
+
+def test_verified_write():
+    async def run() -> CommandQueue:
+        client = FakeClient()
+        client.release.set()
+        queue = CommandQueue(FakeHass(), client)
+        await queue.async_write(1, 100, (0x1234, 0x5678))
+        await queue.async_verify(client.read_block, _read_gap)
+        return queue
+
+    queue = asyncio.run(run())
+    assert queue.unverified == {}
+    assert queue.verify_failures == 0
+
+
+def test_mismatched_read_back():
+    async def run() -> CommandQueue:
+        client = FakeClient()
+        client.release.set()
+        queue = CommandQueue(FakeHass(), client)
+        await queue.async_write(1, 100, (5,))
+        await queue.async_write(1, 101, (6,))
+        # The device clamps the first value
+        client.registers[(1, 100)] = 4
+        with pytest.raises(HomeAssistantError, match="register 100 of unit 1"):
+            await queue.async_verify(client.read_block, _read_gap)
+        return queue
+
+    queue = asyncio.run(run())
+    assert queue.verify_failures == 1
+    assert queue.unverified == {}
+
+
+def test_failed_read_back_retried():
+    async def failing_read(unit: int, block: ReadBlock) -> bytes:
+        raise IOError("timeout")
+
+    async def run() -> CommandQueue:
+        client = FakeClient()
+        client.release.set()
+        queue = CommandQueue(FakeHass(), client)
+        await queue.async_write(1, 100, (5,))
+        await queue.async_verify(failing_read, _read_gap)
+        return queue
+
+    queue = asyncio.run(run())
+    assert queue.unverified == {(1, 100): (5,)}
+    assert queue.verify_failures == 0
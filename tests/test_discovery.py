@@ -0,0 +1,68 @@
+"""Tests for register discovery."""
+from __future__ import annotations
+
+import asyncio
+
+from custom_components.bmz_power2grid.discovery import RegisterProfile, async_probe_unit
+from custom_components.bmz_power2grid.registers import REGISTER_GROUPS
+from custom_components.bmz_power2grid.rtu_codec import ModbusExceptionError
+
+_FIELDS = [f for group in REGISTER_GROUPS for f in group.fields]
+
+
+class FakeDevice:
+    """Answers reads of the registers it implements, rejects all others."""
+
+    def __init__(self, implemented: set[int]) -> None:
+        self.implemented = implemented
+        self.reads: list[tuple[int, int]] = []
+
+    async def read_holding_registers_raw(self, unit: int, address: int, count: int) -> bytes:
+        self.reads.append((address, count))
+        if not all(register in self.implemented for register in range(address, address + count)):
+            raise ModbusExceptionError(0x02)
+        return bytes(2 * count)
+
+
+def _registers(fields) -> set[int]:
+    return {register for f in fields for register in range(f.address, f.address + f.count)}
+
+
+def _probe(device: FakeDevice, max_gap: int = 16) -> RegisterProfile:
+    return asyncio.run(async_probe_unit(device, 1, REGISTER_GROUPS, max_gap))
+
+
+def test_everything_readable() -> None:
+    everything = set(range(0x10000))
+    assert _probe(FakeDevice(everything)) == RegisterProfile()
+
+
+def test_rejected_gaps_disable_merging() -> None:
+    # Every field reads on its own, the unmapped registers between them do not
+    profile = _probe(FakeDevice(_registers(_FIELDS)))
+    assert profile.unsupported == frozenset()
+    assert profile.max_gap == 0
+
+
+def test_missing_field_is_unsupported() -> None:
+    # The last field: no merged read of the remaining ones spans it
+    missing = max(_FIELDS, key=lambda f: f.address)
+    everything = set(range(0x10000)) - _registers([missing])
+    profile = _probe(FakeDevice(everything))
+    assert profile.unsupported == {missing.key}
+    assert profile.max_gap is None
+
+
+def test_reads_across_missing_field_rejected() -> None:
+    missing = next(f for f in _FIELDS if f.key == "grid_l3_v")
+    everything = set(range(0x10000)) - _registers([missing])
+    profile = _probe(FakeDevice(everything))
+    assert profile.unsupported == {"grid_l3_v"}
+    assert profile.max_gap == 0
+
+
+def test_missing_field_and_rejected_gaps() -> None:
+    missing = next(f for f in _FIELDS if f.key == "grid_l3_v")
+    profile = _probe(FakeDevice(_registers(f for f in _FIELDS if f is not missing)))
+    assert profile.unsupported == {"grid_l3_v"}
+    assert profile.max_gap == 0
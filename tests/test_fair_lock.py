@@ -0,0 +1,79 @@
+"""Tests for the round-robin gateway lock."""
+from __future__ import annotations
+
+import asyncio
+
+from custom_components.bmz_power2grid.modbus_client import FairLock
+
+
+async def _grant_order(requests: list[tuple[int, bool]]) -> list[int]:
+    """Units in the order they get the lock, queued while unit 0 holds it."""
+    lock = FairLock()
+    order: list[int] = []
+    release = asyncio.Event()
+
+    async def holder() -> None:
+        async with lock.hold(0):
+            await release.wait()
+
+    async def waiter(unit: int, priority: bool) -> None:
+        async with lock.hold(unit, priority):
+            order.append(unit)
+            await asyncio.sleep(0)
+
+    first = asyncio.ensure_future(holder())
+    await asyncio.sleep(0)
+    tasks = [asyncio.ensure_future(waiter(unit, priority)) for unit, priority in requests]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(first, *tasks)
+    return order
+
+
+def test_round_robin_across_units() -> None:
+    requests = [(1, False), (1, False), (1, False), (2, False), (2, False)]
+    assert asyncio.run(_grant_order(requests)) == [1, 2, 1, 2, 1]
+
+
+def test_priority_goes_first() -> None:
+    requests = [(1, False), (2, False), (9, True)]
+    assert asyncio.run(_grant_order(requests)) == [9, 1, 2]
+
+
+def test_cancel_all_waiters_while_holder_releases() -> None:
+    """Waiters cancelled right before the release still end in CancelledError.
+
+    The release runs before the waiters' cancellation handlers, so it finds
+    their futures cancelled and drops them from the queues first.
+    """
+
+    async def run() -> None:
+        lock = FairLock()
+        waiters: list[asyncio.Task[None]] = []
+        queued = asyncio.Event()
+
+        async def waiter(unit: int, priority: bool = False) -> None:
+            async with lock.hold(unit, priority):
+                pass
+
+        async def holder() -> None:
+            async with lock.hold(0):
+                await queued.wait()
+                # E.g. the poll cycle reached its deadline
+                for task in waiters:
+                    task.cancel()
+
+        first = asyncio.ensure_future(holder())
+        await asyncio.sleep(0)
+        waiters.extend(asyncio.ensure_future(waiter(unit)) for unit in (1, 1, 2, 2))
+        waiters.extend(asyncio.ensure_future(waiter(3, priority=True)) for _ in range(2))
+        await asyncio.sleep(0)
+        queued.set()
+        await first
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(result, asyncio.CancelledError) for result in results), results
+        # Nothing is left queued and the lock can be taken again
+        assert not lock.locked
+        await asyncio.wait_for(waiter(1), 1)
+
+    asyncio.run(run())
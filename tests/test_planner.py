@@ -0,0 +1,53 @@
+"""Tests for the block read planner."""
+from __future__ import annotations
+
+import pytest
+
+from custom_components.bmz_power2grid.const import MAX_REGISTERS_PER_REQUEST
+from custom_components.bmz_power2grid.discovery import RegisterProfile
+from custom_components.bmz_power2grid.planner import ReadBlock, plan_reads
+from custom_components.bmz_power2grid.registers import REGISTER_GROUPS
+
+
+def test_adjacent_and_overlapping_spans_merge():
+    assert plan_reads([(10, 2), (12, 1), (11, 3)], max_gap=0) == (ReadBlock(10, 4),)
+
+
+def test_max_gap():
+    spans = [(0, 2), (5, 2), (20, 1)]
+    assert plan_reads(spans, max_gap=2) == (ReadBlock(0, 2), ReadBlock(5, 2), ReadBlock(20, 1))
+    assert plan_reads(spans, max_gap=3) == (ReadBlock(0, 7), ReadBlock(20, 1))
+    assert plan_reads(spans, max_gap=13) == (ReadBlock(0, 21),)
+
+
+def test_split_at_register_limit():
+    spans = [(address, 2) for address in range(0, 300, 2)]
+    blocks = plan_reads(spans, max_gap=0)
+    assert all(block.count <= MAX_REGISTERS_PER_REQUEST for block in blocks)
+    assert blocks[0] == ReadBlock(0, 124)
+    # Two-register values are never split across blocks
+    assert all(any(block.covers(address, count) for block in blocks) for address, count in spans)
+    assert sum(block.count for block in blocks) == 300
+
+
+def test_span_above_limit_rejected():
+    with pytest.raises(ValueError):
+        plan_reads([(0, 126)])
+
+
+def test_unsupported_registers_leave_holes():
+    fields = [f for group in REGISTER_GROUPS for f in group.fields]
+    # Sits between two other grid_vaf fields
+    missing = next(f for f in fields if f.key == "grid_l2_v")
+    profile = RegisterProfile(frozenset({missing.key}))
+    remaining = [(f.address, f.count) for group in profile.groups(REGISTER_GROUPS) for f in group.fields]
+    assert (missing.address, missing.count) not in remaining
+
+    merged = plan_reads(remaining, max_gap=missing.count)
+    contiguous = plan_reads(remaining, max_gap=0)
+    assert any(block.covers(missing.address, missing.count) for block in merged)
+    assert not any(
+        block.address < missing.address + missing.count and missing.address < block.end for block in contiguous
+    )
+    for address, count in remaining:
+        assert any(block.covers(address, count) for block in contiguous)
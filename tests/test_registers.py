@@ -0,0 +1,109 @@
+"""Tests for the block decoder against a register-by-register decode."""
+from __future__ import annotations
+
+import random
+import struct
+
+import pytest
+
+from custom_components.bmz_power2grid.planner import ReadBlock
+from custom_components.bmz_power2grid.registers import (
+    CONTROLS,
+    I16,
+    I32,
+    REGISTER_GROUPS,
+    U16,
+    U32,
+    BlockDecoder,
+    FieldSpec,
+    compile_groups,
+)
+
+
+def _reference(words: dict[int, int], f: FieldSpec) -> float:
+    """Decode one field from its registers the way the per-register helpers did."""
+    raw = words[f.address]
+    if f.count == 2:
+        # Hi word first
+        raw = (raw << 16) | words[f.address + 1]
+    bits = 16 * f.count
+    if f.type in (I16, I32) and raw >= 1 << (bits - 1):
+        raw -= 1 << bits
+    if f.scale != 1:
+        raw = raw * f.scale
+    return raw if f.digits is None else round(raw, f.digits)
+
+
+def _payload(block: ReadBlock, words: dict[int, int]) -> bytes:
+    return b"".join(struct.pack(">H", words[address]) for address in range(block.address, block.end))
+
+
+def test_types_and_word_order():
+    fields = (
+        FieldSpec("u16", 100, U16),
+        FieldSpec("i16", 101, I16),
+        FieldSpec("u32", 102, U32),
+        FieldSpec("i32", 104, I32),
+    )
+    block = ReadBlock(100, 6)
+    words = [0xFFFF, 0xFFFE, 0x0001, 0x0002, 0xFFFF, 0xFFF6]
+    data: dict = {}
+    BlockDecoder(block, fields).decode(struct.pack(">6H", *words), data)
+    assert data == {"u16": 0xFFFF, "i16": -2, "u32": 0x00010002, "i32": -10}
+
+
+def test_scale_and_digits():
+    fields = (FieldSpec("volts", 0, U16, 0.1, 1), FieldSpec("temp", 1, I16, 0.1, 1))
+    data: dict = {}
+    BlockDecoder(ReadBlock(0, 2), fields).decode(struct.pack(">Hh", 2305, -53), data)
+    assert data == {"volts": 230.5, "temp": -5.3}
+
+
+def test_fields_at_block_boundaries():
+    # Gaps before, between and after the fields are skipped
+    fields = (FieldSpec("first", 10, U32), FieldSpec("last", 16, I32))
+    block = ReadBlock(8, 12)
+    words = {address: 0 for address in range(8, 20)}
+    words.update({10: 0x1234, 11: 0x5678, 16: 0x8000, 17: 0x0000})
+    data: dict = {}
+    BlockDecoder(block, fields).decode(_payload(block, words), data)
+    assert data == {"first": 0x12345678, "last": -0x80000000}
+
+
+def test_field_outside_block_rejected():
+    with pytest.raises(ValueError):
+        BlockDecoder(ReadBlock(0, 3), (FieldSpec("split", 2, U32),))
+    with pytest.raises(ValueError):
+        BlockDecoder(ReadBlock(5, 3), (FieldSpec("before", 4, U16),))
+
+
+@pytest.mark.parametrize("max_gap", [0, 16])
+def test_groups_match_reference(max_gap):
+    rng = random.Random(max_gap)
+    fields = [f for group in REGISTER_GROUPS for f in group.fields]
+    for _ in range(20):
+        words: dict[int, int] = {}
+        data: dict = {}
+        for block, decoder in compile_groups(REGISTER_GROUPS, max_gap):
+            words.update({address: rng.randrange(0x10000) for address in range(block.address, block.end)})
+            decoder.decode(_payload(block, words), data)
+        assert data == {f.key: _reference(words, f) for f in fields}
+
+
+def test_decode_columns_matches_decode():
+    block, decoder = compile_groups(REGISTER_GROUPS, 0)[0]
+    rng = random.Random(1)
+    payloads = [bytes(rng.randrange(256) for _ in range(2 * block.count)) for _ in range(5)]
+    columns = decoder.decode_columns(b"".join(payloads))
+    for index, payload in enumerate(payloads):
+        data: dict = {}
+        decoder.decode(payload, data)
+        assert data == {key: column[index] for key, column in columns.items()}
+
+
+def test_encode_round_trip():
+    for control, value in ((CONTROLS["battery_power_setpoint_w"], -2500), (CONTROLS["grid_injection_limit_pct"], 55.5)):
+        words = dict(enumerate(control.encode(value), control.address))
+        assert _reference(words, control) == pytest.approx(value)
+    with pytest.raises(ValueError):
+        CONTROLS["working_mode"].encode(-1)
@@ -0,0 +1,128 @@
+"""Tests for RTU framing: CRC, request building, response parsing."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from custom_components.bmz_power2grid.rtu_codec import (
+    FUNC_READ_HOLDING,
+    CrcError,
+    FrameError,
+    ModbusExceptionError,
+    RtuFrameProtocol,
+    build_read_request,
+    build_write_request,
+    check_crc,
+    crc16_modbus,
+    parse_read_response,
+    parse_write_response,
+)
+
+# Frames from the Modbus specification and common references
+READ_REQUEST = bytes.fromhex("01 03 00 6B 00 03 74 17")
+READ_RESPONSE = bytes.fromhex("01 03 06 02 2B 00 00 00 64 05 7A")
+WRITE_SINGLE = bytes.fromhex("11 06 00 01 00 03 9A 9B")
+EXCEPTION_RESPONSE = bytes.fromhex("01 83 02 C0 F1")
+
+
+def _corrupt(frame: bytes) -> bytes:
+    return frame[:-1] + bytes([frame[-1] ^ 0xFF])
+
+
+def test_crc_known_frames():
+    assert crc16_modbus(bytes.fromhex("01 03 00 00 00 0A")) == 0xCDC5
+    for frame in (READ_REQUEST, READ_RESPONSE, WRITE_SINGLE, EXCEPTION_RESPONSE):
+        assert check_crc(frame)
+        assert not check_crc(_corrupt(frame))
+
+
+def test_build_requests():
+    assert build_read_request(1, FUNC_READ_HOLDING, 0x6B, 3) == READ_REQUEST
+    assert build_write_request(0x11, 1, (3,)) == WRITE_SINGLE
+    frame = build_write_request(1, 0x10, (0x0102, 0x0304))
+    assert frame[:-2] == bytes.fromhex("01 10 00 10 00 02 04 01 02 03 04")
+    assert check_crc(frame)
+    with pytest.raises(ValueError):
+        build_write_request(1, 0, tuple(range(124)))
+
+
+def test_parse_read_response():
+    data = parse_read_response(memoryview(READ_RESPONSE), 1, FUNC_READ_HOLDING, 3)
+    assert bytes(data) == bytes.fromhex("02 2B 00 00 00 64")
+
+
+def test_parse_bad_frames():
+    with pytest.raises(CrcError):
+        parse_read_response(memoryview(_corrupt(READ_RESPONSE)), 1, FUNC_READ_HOLDING, 3)
+    with pytest.raises(FrameError):
+        parse_read_response(memoryview(READ_RESPONSE), 2, FUNC_READ_HOLDING, 3)
+    with pytest.raises(FrameError):
+        parse_read_response(memoryview(READ_RESPONSE), 1, FUNC_READ_HOLDING, 4)
+    with pytest.raises(CrcError):
+        parse_write_response(memoryview(_corrupt(WRITE_SINGLE)), WRITE_SINGLE)
+    parse_write_response(memoryview(WRITE_SINGLE), WRITE_SINGLE)
+
+
+def test_exception_response():
+    with pytest.raises(ModbusExceptionError) as err:
+        parse_read_response(memoryview(EXCEPTION_RESPONSE), 1, FUNC_READ_HOLDING, 3)
+    assert err.value.code == 0x02
+    with pytest.raises(ModbusExceptionError):
+        parse_write_response(memoryview(EXCEPTION_RESPONSE), READ_REQUEST)
+
+
+class FakeTransport:
+    def __init__(self) -> None:
+        self.written: list[bytes] = []
+
+    def write(self, data: bytes) -> None:
+        self.written.append(data)
+
+    def is_closing(self) -> bool:
+        return False
+
+
+def _feed(protocol: RtuFrameProtocol, data: bytes) -> None:
+    """Deliver bytes the way the event loop does for a BufferedProtocol."""
+    buf = protocol.get_buffer(len(data))
+    buf[:len(data)] = data
+    protocol.buffer_updated(len(data))
+
+
+async def _exchange(chunks: list[bytes], timeout: float = 1) -> bytes:
+    protocol = RtuFrameProtocol()
+    transport = FakeTransport()
+    protocol.connection_made(transport)
+    task = asyncio.create_task(protocol.request(READ_REQUEST, timeout))
+    await asyncio.sleep(0)
+    assert transport.written == [READ_REQUEST]
+    for chunk in chunks:
+        _feed(protocol, chunk)
+    return bytes(await task)
+
+
+def test_split_response_reassembled():
+    # Header split before the byte count, then the rest in pieces
+    chunks = [READ_RESPONSE[:2], READ_RESPONSE[2:5], READ_RESPONSE[5:10], READ_RESPONSE[10:]]
+    assert asyncio.run(_exchange(chunks)) == READ_RESPONSE
+    assert asyncio.run(_exchange([bytes([b]) for b in EXCEPTION_RESPONSE])) == EXCEPTION_RESPONSE
+
+
+def test_truncated_response():
+    with pytest.raises(FrameError):
+        asyncio.run(_exchange([READ_RESPONSE[:6]], timeout=0.05))
+
+
+def test_unsolicited_bytes_discarded():
+    async def run() -> bytes:
+        protocol = RtuFrameProtocol()
+        protocol.connection_made(FakeTransport())
+        # Nothing is waiting, so these must not end up in the frame buffer
+        _feed(protocol, b"\xff" * 8)
+        task = asyncio.create_task(protocol.request(READ_REQUEST, 1))
+        await asyncio.sleep(0)
+        _feed(protocol, READ_RESPONSE)
+        return bytes(await task)
+
+    assert asyncio.run(run()) == READ_RESPONSE
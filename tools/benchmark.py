@@ -0,0 +1,209 @@
+"""Polling benchmark against the local simulator.
+
+Runs BmzCoordinator._async_update_data in a loop against
+tools/simulator.py and reports, per scenario, cycle latency, requests and
+bytes on the wire per cycle, and CPU time per cycle.
+
+    python tools/benchmark.py --cycles 200 --latency 0.02
+
+Scenarios cover every combination of --scan-interval and --transport.
+--record writes the frames of the run to a capture file; --replay answers
+every request from such a capture instead of the simulator (bytes on the
+wire are not counted then).
+Time between cycles is simulated by ageing the coordinator's per-group
+read timestamps, so medium and slow tiers come due at the same rate as in
+production without the benchmark having to sleep. Requires Home Assistant
+(pip install homeassistant).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.const import CONF_HOST, CONF_PORT  # noqa: E402
+from homeassistant.helpers.update_coordinator import UpdateFailed  # noqa: E402
+
+from custom_components.bmz_power2grid.capture import FrameRecorder, ReplayClient  # noqa: E402
+from custom_components.bmz_power2grid.const import (  # noqa: E402
+    CONF_UNIT_ID,
+    CONF_SCAN_INTERVAL,
+    CONF_TRANSPORT,
+    TRANSPORT_MODBUS_TCP,
+    TRANSPORT_RTU_OVER_TCP,
+)
+from custom_components.bmz_power2grid.coordinator import BmzCoordinator  # noqa: E402
+
+from simulator import SolintegSimulator  # noqa: E402
+
+# Integration transport -> simulator framing
+TRANSPORTS = {TRANSPORT_RTU_OVER_TCP: "rtu", TRANSPORT_MODBUS_TCP: "tcp"}
+# Capture files are not rotated during a benchmark
+_RECORD_MAX_BYTES = 1 << 40
+
+
+@dataclass
+class _Entry:
+    """The parts of a ConfigEntry the coordinator reads."""
+
+    entry_id: str
+    data: dict[str, Any]
+    options: dict[str, Any]
+    title: str = "benchmark"
+
+
+@dataclass
+class ScenarioResult:
+    transport: str
+    scan_interval: int
+    cycles: int
+    failures: int
+    latencies: list[float]
+    requests: int
+    bytes_on_wire: int
+    cpu: float
+
+    def row(self) -> str:
+        ok = max(1, self.cycles)
+        lat = sorted(self.latencies) or [0.0]
+        p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+        return (
+            f"{self.transport:<12} {self.scan_interval:>5}s {self.cycles:>6} {self.failures:>5} "
+            f"{statistics.median(lat) * 1000:>9.2f} {p95 * 1000:>9.2f} "
+            f"{self.requests / ok:>9.2f} {self.bytes_on_wire / ok:>9.1f} {self.cpu / ok * 1000:>9.3f}"
+        )
+
+
+HEADER = (
+    f"{'transport':<12} {'scan':>6} {'cycles':>6} {'fail':>5} "
+    f"{'p50 ms':>9} {'p95 ms':>9} {'req/cyc':>9} {'B/cyc':>9} {'cpu ms':>9}"
+)
+
+
+async def run_scenario(
+    hass: HomeAssistant,
+    sim: SolintegSimulator | None,
+    port: int,
+    transport: str,
+    scan_interval: int,
+    cycles: int,
+    record: Path | None = None,
+    replay: Path | None = None,
+) -> ScenarioResult:
+    replay_client = None if replay is None else ReplayClient(replay)
+    entry = _Entry(
+        entry_id=f"bench-{transport}-{scan_interval}",
+        data={
+            CONF_HOST: "127.0.0.1",
+            CONF_PORT: port,
+            CONF_UNIT_ID: replay_client.units[0] if replay_client is not None else sim.unit_ids[0],
+            CONF_SCAN_INTERVAL: scan_interval,
+            CONF_TRANSPORT: transport,
+        },
+        options={},
+    )
+    coordinator = BmzCoordinator(hass, entry)  # type: ignore[arg-type]
+    if replay_client is not None:
+        coordinator.client = coordinator.commands.client = replay_client
+    recorder = None
+    if record is not None:
+        recorder = coordinator.client.recorder = FrameRecorder(record, _RECORD_MAX_BYTES)
+    requests_before = coordinator.client.metrics.requests if sim is None else sim.stats.requests
+    bytes_before = 0 if sim is None else sim.stats.bytes_in + sim.stats.bytes_out
+    latencies: list[float] = []
+    failures = 0
+    cpu = 0.0
+    try:
+        for _ in range(cycles):
+            # Pretend one scan interval passed since the previous cycle
+            for name in coordinator._last_read:
+                coordinator._last_read[name] -= scan_interval
+            cpu_start = time.process_time()
+            start = time.perf_counter()
+            try:
+                coordinator.data = await coordinator._async_update_data()
+            except UpdateFailed:
+                failures += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+            cpu += time.process_time() - cpu_start
+    finally:
+        if recorder is not None:
+            coordinator.client.recorder = None
+            await recorder.async_close()
+        requests = (coordinator.client.metrics.requests if sim is None else sim.stats.requests) - requests_before
+        await coordinator.async_close()
+    return ScenarioResult(
+        transport="replay" if replay is not None else transport,
+        scan_interval=scan_interval,
+        cycles=cycles,
+        failures=failures,
+        latencies=latencies,
+        requests=requests,
+        bytes_on_wire=0 if sim is None else sim.stats.bytes_in + sim.stats.bytes_out - bytes_before,
+        cpu=cpu,
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        print(HEADER)
+        try:
+            if args.replay is not None:
+                for scan_interval in args.scan_interval or (1, 5):
+                    result = await run_scenario(
+                        hass, None, 0, TRANSPORT_RTU_OVER_TCP, scan_interval, args.cycles, replay=args.replay
+                    )
+                    print(result.row())
+                return
+            for transport in args.transport or TRANSPORTS:
+                sim = SolintegSimulator(
+                    latency=args.latency,
+                    jitter=args.jitter,
+                    drop_rate=args.drop_rate,
+                    truncate_rate=args.truncate_rate,
+                    seed=args.seed,
+                    framing=TRANSPORTS[transport],
+                )
+                port = await sim.start()
+                try:
+                    for scan_interval in args.scan_interval or (1, 5):
+                        result = await run_scenario(
+                            hass, sim, port, transport, scan_interval, args.cycles, record=args.record
+                        )
+                        print(result.row())
+                finally:
+                    await sim.stop()
+        finally:
+            await hass.async_stop(force=True)
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=100)
+    parser.add_argument("--scan-interval", type=int, action="append", help="seconds (repeatable)")
+    parser.add_argument("--transport", choices=list(TRANSPORTS), action="append", help="repeatable")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--record", type=Path, help="append the frames of every scenario to this capture")
+    parser.add_argument("--replay", type=Path, help="answer requests from this capture instead of the simulator")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(_parse_args()))
@@ -0,0 +1,150 @@
+"""Decode a raw frame capture into columns, CSV or a summary.
+
+The integration records every request and response on the gateway
+connection when "Record raw frames" is set (files named
+capture_<host>_<port>.bin in the bmz_power2grid folder of the Home
+Assistant config directory).
+
+    python tools/replay.py capture.bin                 # summary
+    python tools/replay.py capture.bin --csv out.csv   # time,unit,key,value
+    python tools/replay.py capture.bin --key pv_power_w --csv pv.csv
+
+The capture is memory-mapped, responses are grouped by the block they
+answer and each block is decoded in bulk with the coordinator's register
+map, so days of 1 s captures decode in seconds. Derived values (grid
+import/export, house load, ...) are not recomputed. Importing the register
+map pulls in the integration package, so Home Assistant must be installed
+(pip install homeassistant).
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import mmap
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.bmz_power2grid.capture import iter_records  # noqa: E402
+from custom_components.bmz_power2grid.planner import ReadBlock  # noqa: E402
+from custom_components.bmz_power2grid.registers import REGISTER_GROUPS, compile_block  # noqa: E402
+from custom_components.bmz_power2grid.rtu_codec import FUNC_READ_HOLDING  # noqa: E402
+
+_READ_REQUEST = struct.Struct(">BHH")
+_FIELDS = tuple(f for group in REGISTER_GROUPS for f in group.fields)
+
+
+@dataclass
+class _BlockResponses:
+    size: int
+    times: array = field(default_factory=lambda: array("d"))
+    payloads: list = field(default_factory=list)
+
+
+@dataclass
+class Capture:
+    """Decoded values of one capture, one column per (unit, key)."""
+
+    records: int = 0
+    failed: int = 0
+    times: dict[tuple[int, str], array] = field(default_factory=dict)
+    values: dict[tuple[int, str], list] = field(default_factory=dict)
+
+
+def decode_capture(buffer, keys: set[str] | None = None) -> Capture:
+    """Decode every successful block read in `buffer` (bytes or mmap)."""
+    capture = Capture()
+    # Responses by (unit, request PDU); None for requests that are not reads
+    blocks: dict[tuple[int, bytes], _BlockResponses | None] = {}
+    for timestamp, unit, request, response in iter_records(buffer):
+        capture.records += 1
+        key = (unit, bytes(request))
+        try:
+            responses = blocks[key]
+        except KeyError:
+            responses = blocks[key] = (
+                _BlockResponses(2 + 2 * _READ_REQUEST.unpack_from(request)[2])
+                if request[0] == FUNC_READ_HOLDING
+                else None
+            )
+        if responses is None:
+            continue
+        if len(response) != responses.size or response[0] != FUNC_READ_HOLDING:
+            capture.failed += 1
+            continue
+        responses.times.append(timestamp)
+        responses.payloads.append(response[2:])
+
+    for (unit, request), responses in blocks.items():
+        if responses is None:
+            continue
+        _func, address, count = _READ_REQUEST.unpack_from(request)
+        block = ReadBlock(address, count)
+        fields = tuple(
+            f for f in _FIELDS if block.covers(f.address, f.count) and (keys is None or f.key in keys)
+        )
+        if not fields:
+            continue
+        columns = compile_block(block, fields).decode_columns(b"".join(responses.payloads))
+        for key, column in columns.items():
+            # A field may be read by several block shapes, e.g. after
+            # discovery changed the plan
+            times = capture.times.setdefault((unit, key), array("d"))
+            times.extend(responses.times)
+            capture.values.setdefault((unit, key), []).extend(column)
+    for name, times in capture.times.items():
+        if any(b < a for a, b in zip(times, times[1:])):
+            order = sorted(range(len(times)), key=times.__getitem__)
+            capture.times[name] = array("d", (times[i] for i in order))
+            capture.values[name] = [capture.values[name][i] for i in order]
+    return capture
+
+
+def write_csv(capture: Capture, path: Path) -> int:
+    rows = 0
+    with path.open("w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(("time", "unit", "key", "value"))
+        for (unit, key), times in sorted(capture.times.items()):
+            writer.writerows(zip(times, (unit,) * len(times), (key,) * len(times), capture.values[(unit, key)]))
+            rows += len(times)
+    return rows
+
+
+def print_summary(capture: Capture) -> None:
+    print(f"{capture.records} records, {capture.failed} without a valid response")
+    print(f"{'unit':>4} {'key':<32} {'samples':>8} {'first':>20} {'last value':>12}")
+    for (unit, key), times in sorted(capture.times.items()):
+        first = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(times[0]))
+        print(f"{unit:>4} {key:<32} {len(times):>8} {first:>20} {capture.values[(unit, key)][-1]:>12}")
+
+
+def main(args: argparse.Namespace) -> None:
+    keys = set(args.key) if args.key else None
+    with open(args.capture, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        start = time.perf_counter()
+        capture = decode_capture(buffer, keys)
+        elapsed = time.perf_counter() - start
+    print(f"Decoded {args.capture} in {elapsed:.2f} s", file=sys.stderr)
+    if args.csv:
+        rows = write_csv(capture, args.csv)
+        print(f"Wrote {rows} rows to {args.csv}", file=sys.stderr)
+    else:
+        print_summary(capture)
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", type=Path)
+    parser.add_argument("--csv", type=Path, help="write time,unit,key,value rows instead of a summary")
+    parser.add_argument("--key", action="append", help="only decode this key (repeatable)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(_parse_args())
@@ -0,0 +1,308 @@
+"""Solinteg Modbus RTU-over-TCP simulator.
+
+Serves the register map the integration decodes (see
+custom_components/bmz_power2grid/registers.py) with plausible, slowly
+drifting values, and can misbehave like a real WiFi dongle: per-request
+latency and jitter, dropped and truncated responses, and a small
+connection limit. Register writes (0x06/0x10) are stored and read back.
+
+    python tools/simulator.py --port 5743 --latency 0.05 --jitter 0.02
+
+With --framing tcp it speaks Modbus TCP instead of RTU-over-TCP and
+answers pipelined requests concurrently, each after its own latency.
+
+Importing the register map pulls in the integration package, so Home
+Assistant must be installed (pip install homeassistant).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import struct
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.bmz_power2grid.registers import REGISTER_GROUPS, U16, I16, U32, I32  # noqa: E402
+from custom_components.bmz_power2grid.rtu_codec import crc16_modbus  # noqa: E402
+
+_LOGGER = logging.getLogger("simulator")
+
+# Typical midday values: (mean, random walk step, lower bound, upper bound)
+PROFILE: dict[str, tuple[float, float, float, float]] = {
+    "pv_power_w": (4200, 150, 0, 10000),
+    "battery_power_w": (-1500, 120, -5000, 5000),
+    "grid_l1_w": (600, 60, -4000, 4000),
+    "grid_l2_w": (550, 60, -4000, 4000),
+    "grid_l3_w": (500, 60, -4000, 4000),
+    "grid_power_total_w": (1650, 150, -12000, 12000),
+    "battery_voltage": (412.0, 0.3, 380, 450),
+    "battery_current": (-3.6, 0.2, -12, 12),
+    "battery_soc_pct": (64.0, 0.01, 0, 100),
+    "battery_soh_pct": (98.5, 0.0, 0, 100),
+    "grid_l1_v": (231.0, 0.4, 210, 250),
+    "grid_l1_a": (2.6, 0.2, 0, 40),
+    "grid_l2_v": (230.4, 0.4, 210, 250),
+    "grid_l2_a": (2.4, 0.2, 0, 40),
+    "grid_l3_v": (229.8, 0.4, 210, 250),
+    "grid_l3_a": (2.2, 0.2, 0, 40),
+    "grid_frequency": (50.0, 0.01, 49.8, 50.2),
+    "inverter_temp_c": (41.0, 0.1, -20, 90),
+    "battery_temp_c": (24.0, 0.05, -20, 60),
+}
+# Energy counters only ever grow: (start value, increment per update)
+COUNTERS: dict[str, tuple[float, float]] = {
+    "total_grid_export_kwh": (8123.4, 0.01),
+    "total_grid_import_kwh": (2311.7, 0.002),
+    "total_battery_charge_kwh": (3120.2, 0.005),
+    "total_battery_discharge_kwh": (2987.5, 0.004),
+    "total_pv_energy_kwh": (15321.9, 0.02),
+    "total_load_kwh": (9734.0, 0.01),
+    "daily_grid_export_kwh": (12.3, 0.01),
+    "daily_grid_import_kwh": (1.4, 0.002),
+    "daily_battery_charge_kwh": (6.1, 0.005),
+    "daily_battery_discharge_kwh": (2.2, 0.004),
+    "daily_pv_energy_kwh": (24.8, 0.02),
+    "daily_load_kwh": (10.6, 0.01),
+}
+
+_PACK = {U16: ">H", I16: ">h", U32: ">I", I32: ">i"}
+_LIMITS = {U16: (0, 0xFFFF), I16: (-0x8000, 0x7FFF), U32: (0, 0xFFFFFFFF), I32: (-0x80000000, 0x7FFFFFFF)}
+
+
+@dataclass
+class SimulatorStats:
+    connections: int = 0
+    refused: int = 0
+    requests: int = 0
+    dropped: int = 0
+    truncated: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+
+@dataclass
+class SolintegSimulator:
+    unit_ids: tuple[int, ...] = (252,)
+    latency: float = 0.0
+    jitter: float = 0.0
+    drop_rate: float = 0.0
+    truncate_rate: float = 0.0
+    max_connections: int = 2
+    seed: int | None = None
+    framing: str = "rtu"  # or "tcp" for Modbus TCP
+
+    stats: SimulatorStats = field(default_factory=SimulatorStats)
+    registers: dict[int, int] = field(default_factory=dict)
+    _values: dict[str, float] = field(default_factory=dict, repr=False)
+    _server: asyncio.AbstractServer | None = field(default=None, repr=False)
+    _active: int = field(default=0, repr=False)
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.seed)
+        self._fields = [f for group in REGISTER_GROUPS for f in group.fields]
+        self._profile = dict(PROFILE)
+        for key, (mean, *_rest) in PROFILE.items():
+            self._values[key] = mean
+        for key, (start, _step) in COUNTERS.items():
+            self._values[key] = start
+        self._store()
+
+    def _store(self) -> None:
+        """Encode the current physical values into registers."""
+        for f in self._fields:
+            if f.key not in self._values:
+                continue
+            raw = round(self._values[f.key] / f.scale)
+            low, high = _LIMITS[f.type]
+            packed = struct.pack(_PACK[f.type], min(max(raw, low), high))
+            for i in range(f.count):
+                self.registers[f.address + i] = int.from_bytes(packed[2 * i:2 * i + 2], "big")
+
+    def step(self) -> None:
+        """Advance the simulated plant by one tick."""
+        rng = self._rng
+        for key, (mean, step, low, high) in self._profile.items():
+            value = self._values[key] + rng.gauss(0, step) + (mean - self._values[key]) * 0.05
+            self._values[key] = min(max(value, low), high)
+        for key, (_start, inc) in COUNTERS.items():
+            self._values[key] += inc * rng.random()
+        self._store()
+
+    def set_value(self, key: str, value: float) -> None:
+        """Pin a decoded value, e.g. for reproducing an edge case."""
+        self._values[key] = value
+        self._profile.pop(key, None)
+        self._store()
+
+    def respond(self, request: bytes) -> bytes:
+        """Build the response frame for one request frame."""
+        unit, func, address, count = struct.unpack(">BBHH", request[:6])
+        if func == 0x06:
+            # count is the value here; echo the request
+            self.registers[address] = count
+            return request
+        if func == 0x10:
+            if not 1 <= count <= 123 or request[6] != 2 * count:
+                return self._exception(unit, func, 0x03)
+            for i, value in enumerate(struct.unpack_from(f">{count}H", request, 7)):
+                self.registers[address + i] = value
+            pdu = request[:6]
+            return pdu + struct.pack("<H", crc16_modbus(pdu))
+        if func != 0x03:
+            return self._exception(unit, func, 0x01)
+        if not 1 <= count <= 125:
+            return self._exception(unit, func, 0x03)
+        self.step()
+        data = b"".join(struct.pack(">H", self.registers.get(address + i, 0)) for i in range(count))
+        pdu = bytes((unit, func, len(data))) + data
+        return pdu + struct.pack("<H", crc16_modbus(pdu))
+
+    @staticmethod
+    def _exception(unit: int, func: int, code: int) -> bytes:
+        pdu = bytes((unit, func | 0x80, code))
+        return pdu + struct.pack("<H", crc16_modbus(pdu))
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start serving; returns the bound port."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self._active >= self.max_connections:
+            # The real dongle accepts and immediately resets extra sockets.
+            self.stats.refused += 1
+            writer.close()
+            return
+        self._active += 1
+        self.stats.connections += 1
+        if self.framing == "tcp":
+            await self._handle_tcp(reader, writer)
+            return
+        try:
+            while True:
+                request = await reader.readexactly(8)
+                if request[1] == 0x10:
+                    # Header read so far covers the byte count and one data byte
+                    request += await reader.readexactly(request[6] + 1)
+                self.stats.requests += 1
+                self.stats.bytes_in += len(request)
+                if crc16_modbus(request) != 0:
+                    continue  # garbled requests are ignored, like on the bus
+                unit = request[0]
+                if unit not in self.unit_ids:
+                    continue  # nobody answers on RS485
+                response = self.respond(request)
+                delay = self.latency + self._rng.uniform(0, self.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                roll = self._rng.random()
+                if roll < self.drop_rate:
+                    self.stats.dropped += 1
+                    continue
+                if roll < self.drop_rate + self.truncate_rate:
+                    self.stats.truncated += 1
+                    response = response[: self._rng.randrange(1, len(response))]
+                writer.write(response)
+                self.stats.bytes_out += len(response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._active -= 1
+            writer.close()
+
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        tasks: set[asyncio.Task] = set()
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                tid, _protocol, length, unit = struct.unpack(">HHHB", header)
+                pdu = await reader.readexactly(length - 1)
+                self.stats.requests += 1
+                self.stats.bytes_in += len(header) + len(pdu)
+                if unit not in self.unit_ids:
+                    continue
+                task = asyncio.create_task(self._answer_tcp(writer, tid, unit, pdu))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._active -= 1
+            writer.close()
+
+    async def _answer_tcp(self, writer: asyncio.StreamWriter, tid: int, unit: int, pdu: bytes) -> None:
+        # Reuse the RTU responder and swap the CRC for an MBAP header
+        rtu = bytes((unit,)) + pdu
+        response_pdu = self.respond(rtu + struct.pack("<H", crc16_modbus(rtu)))[1:-2]
+        delay = self.latency + self._rng.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        response = struct.pack(">HHHB", tid, 0, len(response_pdu) + 1, unit) + response_pdu
+        roll = self._rng.random()
+        if roll < self.drop_rate:
+            self.stats.dropped += 1
+            return
+        if roll < self.drop_rate + self.truncate_rate:
+            # A truncated ADU would desync the stream for good; real gateways
+            # close the connection instead.
+            self.stats.truncated += 1
+            writer.close()
+            return
+        writer.write(response)
+        self.stats.bytes_out += len(response)
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5743)
+    parser.add_argument("--unit", type=int, action="append", dest="units", help="unit ID (repeatable)")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.02, help="extra random seconds per request")
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--max-connections", type=int, default=2)
+    parser.add_argument("--framing", choices=("rtu", "tcp"), default="rtu")
+    parser.add_argument("--seed", type=int)
+    return parser.parse_args(argv)
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    sim = SolintegSimulator(
+        unit_ids=tuple(args.units or (252,)),
+        latency=args.latency,
+        jitter=args.jitter,
+        drop_rate=args.drop_rate,
+        truncate_rate=args.truncate_rate,
+        max_connections=args.max_connections,
+        seed=args.seed,
+        framing=args.framing,
+    )
+    port = await sim.start(args.host, args.port)
+    _LOGGER.info("Serving units %s on %s:%s", sim.unit_ids, args.host, port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await sim.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_serve(_parse_args()))
+    except KeyboardInterrupt:
+        pass